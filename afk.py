@@ -0,0 +1,202 @@
+"""
+Detección de clientes inactivos (AFK) a partir de los tiempos de inactividad
+
+Cada AFK_SWEEP_INTERVAL segundos se pide una sola vez
+`clientlist -times -away -voice` y se actualiza un índice por cliente con el
+instante de su última actividad. Un montículo ordenado por el próximo
+vencimiento (mover o expulsar) evita recorrer a todos los clientes: en cada
+barrido solo se tocan los clientes que cambiaron y los que vencen.
+
+Las acciones se agrupan en un lote por barrido y salen por la misma cola
+masiva que !mm y !mk (mismo registro y auditoría).
+"""
+
+import heapq
+import time
+import logging
+from config import (AFK_ENABLED, AFK_SWEEP_INTERVAL, AFK_CHANNEL_ID, AFK_MOVE_AFTER,
+                    AFK_AWAY_MOVE_AFTER, AFK_KICK_AFTER, AFK_KICK_MESSAGE)
+from command_queue import PRIORITY_BULK
+from serverquery import parse_list, is_ok, escape
+
+AFK_QUERY = "clientlist -times -away -voice"
+
+STATE_ACTIVE = "active"
+STATE_MOVED = "moved"
+STATE_DONE = "done"
+
+
+class IdleClient:
+    """Entrada del índice de inactividad"""
+
+    __slots__ = ("clid", "client", "last_active", "away", "state", "due")
+
+    def __init__(self, clid, client, last_active, away):
+        self.clid = clid
+        self.client = client
+        self.last_active = last_active
+        self.away = away
+        self.state = STATE_ACTIVE
+        self.due = None
+
+
+class AFKEngine:
+    """Mueve o expulsa clientes inactivos con un barrido periódico de clientlist"""
+
+    def __init__(self, bot, enabled=AFK_ENABLED, interval=AFK_SWEEP_INTERVAL, channel_id=AFK_CHANNEL_ID,
+                 move_after=AFK_MOVE_AFTER, away_move_after=AFK_AWAY_MOVE_AFTER, kick_after=AFK_KICK_AFTER,
+                 kick_message=AFK_KICK_MESSAGE):
+        self.bot = bot
+        self.logger = logging.getLogger(__name__)
+
+        # clid -> IdleClient, y montículo de (vencimiento, clid) con invalidación diferida
+        self.index = {}
+        self.heap = []
+
+        self.sweeps = 0
+        self.changed = 0
+        self.moved = 0
+        self.kicked = 0
+        self.last_sweep_ms = 0.0
+        self.in_flight = False
+        self.timer = None
+
+        self.configure(interval, channel_id, move_after, away_move_after, kick_after, kick_message)
+        self.enabled = enabled and self.has_action
+        if enabled and not self.enabled:
+            self.logger.error("❌ AFK activado sin AFK_CHANNEL_ID ni AFK_KICK_AFTER: no hay acción que aplicar")
+        if self.enabled:
+            self.timer = self.bot.scheduler.wheel.schedule(self.interval, self._tick)
+            self.logger.info(f"💤 Detección AFK activa (barrido cada {self.interval} s)")
+
+    @property
+    def has_action(self):
+        return bool(self.move_after or self.away_move_after or self.kick_after)
+
+    def configure(self, interval, channel_id, move_after, away_move_after, kick_after, kick_message):
+        """Cambiar umbrales y canal (también en caliente); recalcula los vencimientos pendientes"""
+        self.interval = interval
+        self.channel_id = str(channel_id) if channel_id else None
+        self.move_after = move_after if self.channel_id else 0
+        self.away_move_after = away_move_after if self.channel_id else 0
+        self.kick_after = kick_after
+        self.kick_message = kick_message
+
+        # Reconstruir el montículo con los nuevos umbrales (O(clientes), solo al reconfigurar)
+        self.heap = []
+        for record in self.index.values():
+            self._reschedule(record)
+
+    def stop(self):
+        """Detener los barridos"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def _tick(self):
+        """Temporizador: reprogramar y encolar el barrido"""
+        self.timer = self.bot.scheduler.wheel.schedule(self.interval, self._tick)
+        # Un solo barrido en vuelo: si la cola masiva va atrasada no se acumulan consultas
+        if self.in_flight or not self.bot.connected:
+            return
+        self.in_flight = True
+        self.bot.outbound.submit(AFK_QUERY, PRIORITY_BULK, self._on_clientlist)
+
+    def _on_clientlist(self, response):
+        self.in_flight = False
+        if not is_ok(response):
+            if response is not None:
+                self.logger.warning(f"⚠️ Barrido AFK fallido: {response.strip()}")
+            return
+        self.sweep(parse_list(response))
+
+    def _thresholds(self, record):
+        """Vencimiento de la próxima acción de un cliente (None si no queda ninguna)"""
+        if record.state == STATE_ACTIVE:
+            move_after = self.away_move_after if record.away and self.away_move_after else self.move_after
+            if move_after and record.client.get('cid') != self.channel_id:
+                return record.last_active + move_after
+        if record.state != STATE_DONE and self.kick_after:
+            return record.last_active + self.kick_after
+        return None
+
+    def _reschedule(self, record):
+        record.due = self._thresholds(record)
+        if record.due is not None:
+            heapq.heappush(self.heap, (record.due, record.clid))
+
+    def sweep(self, client_list, now=None):
+        """Actualizar el índice con un clientlist y lanzar las acciones vencidas"""
+        now = time.monotonic() if now is None else now
+        start = time.perf_counter()
+        # Tolerancia: el tiempo de inactividad del servidor y nuestro reloj no avanzan a la par
+        tolerance = max(1.0, self.bot.scheduler.wheel.tick)
+        seen = set()
+        changed = 0
+
+        for client in client_list:
+            clid = client.get('clid')
+            if client.get('client_type') != '0' or clid == self.bot.bot_client_id:
+                continue
+            seen.add(clid)
+            last_active = now - int(client.get('client_idle_time', 0)) / 1000
+            away = client.get('client_away') == '1' or client.get('client_output_muted') == '1'
+
+            record = self.index.get(clid)
+            if record is None:
+                record = self.index[clid] = IdleClient(clid, client, last_active, away)
+            elif last_active - record.last_active > tolerance or away != record.away:
+                # Hubo actividad (o cambió el estado ausente): vuelve a contar desde cero
+                record.client = client
+                record.last_active = last_active
+                record.away = away
+                record.state = STATE_ACTIVE
+            else:
+                record.client = client
+                continue
+            changed += 1
+            self._reschedule(record)
+
+        # Clientes desconectados: sus entradas del montículo se descartan al salir
+        for clid in self.index.keys() - seen:
+            del self.index[clid]
+
+        to_move = []
+        to_kick = []
+        while self.heap and self.heap[0][0] <= now:
+            due, clid = heapq.heappop(self.heap)
+            record = self.index.get(clid)
+            if record is None or record.due != due:
+                continue
+            kick_due = self.kick_after and now - record.last_active >= self.kick_after
+            if record.state == STATE_ACTIVE and self.channel_id and not kick_due and \
+                    record.client.get('cid') != self.channel_id:
+                record.state = STATE_MOVED
+                to_move.append(record.client)
+            else:
+                record.state = STATE_DONE
+                if self.kick_after:
+                    to_kick.append(record.client)
+            self._reschedule(record)
+
+        self.sweeps += 1
+        self.changed = changed
+        self.last_sweep_ms = (time.perf_counter() - start) * 1000
+
+        if to_move:
+            self.moved += len(to_move)
+            self.logger.info(f"💤 {len(to_move)} clientes inactivos se moverán al canal AFK {self.channel_id}")
+            self.bot.start_mass_move(self.channel_id, "💤 AFK", clients=to_move)
+        if to_kick:
+            self.kicked += len(to_kick)
+            self.logger.info(f"💤 {len(to_kick)} clientes inactivos serán expulsados")
+            self.bot.start_mass_kick(escape(self.kick_message), self.kick_message, "💤 AFK", clients=to_kick)
+        return len(to_move), len(to_kick)
+
+    def summary(self):
+        """Resumen de una línea para el log"""
+        return (
+            f"{len(self.index)} clientes seguidos, {self.sweeps} barridos "
+            f"(último {self.last_sweep_ms:.1f} ms, {self.changed} cambios), "
+            f"{self.moved} movidos, {self.kicked} expulsados"
+        )
@@ -0,0 +1,206 @@
+"""
+Registro de auditoría de comandos con escritura asíncrona por lotes
+
+Los registros se encolan en memoria (cola acotada, sin bloquear nunca al bot)
+y un hilo en segundo plano los escribe por lotes en JSON lines o SQLite,
+cuando se llena un lote o cuando pasa el intervalo de volcado.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from config import AUDIT_BACKEND, AUDIT_PATH, AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL
+
+
+class JSONLinesAuditSink:
+    """Destino de auditoría en archivo JSON lines (un registro por línea)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def write_batch(self, records):
+        self.file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class SQLiteAuditSink:
+    """Destino de auditoría en base de datos SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = None
+
+    def open(self):
+        # La conexión se crea en el hilo escritor: sqlite3 no comparte conexiones entre hilos
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                invoker_id TEXT,
+                invoker_name TEXT,
+                command TEXT NOT NULL,
+                arguments TEXT,
+                outcome TEXT NOT NULL,
+                targets TEXT,
+                ok INTEGER,
+                failed INTEGER,
+                duration_ms REAL
+            )"""
+        )
+        self.db.commit()
+
+    def write_batch(self, records):
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO audit (ts, invoker_id, invoker_name, command, arguments, outcome, targets, ok, failed, duration_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["ts"], record.get("invoker_id"), record.get("invoker_name"),
+                        record["command"], record.get("arguments"), record["outcome"],
+                        json.dumps(record.get("targets", []), ensure_ascii=False),
+                        record.get("ok"), record.get("failed"), record.get("duration_ms")
+                    )
+                    for record in records
+                ]
+            )
+
+    def close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+
+SINKS = {
+    "jsonl": JSONLinesAuditSink,
+    "sqlite": SQLiteAuditSink
+}
+
+
+class AuditLog:
+    """Registro de auditoría con cola acotada y escritor en segundo plano"""
+
+    def __init__(self, sink, queue_size=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.logger = logging.getLogger(__name__)
+
+        self.thread = threading.Thread(target=self._writer, name="audit-writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def enabled(self):
+        return True
+
+    def record(self, command, outcome, invoker_id=None, invoker_name=None, arguments=None,
+               targets=None, ok=None, failed=None, duration_ms=None):
+        """Encolar un registro sin bloquear; si la cola está llena el registro se descarta y se cuenta"""
+        entry = {
+            "ts": time.time(),
+            "invoker_id": invoker_id,
+            "invoker_name": invoker_name,
+            "command": command,
+            "arguments": arguments,
+            "outcome": outcome,
+            "targets": targets or [],
+            "ok": ok,
+            "failed": failed,
+            "duration_ms": duration_ms
+        }
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                self.logger.warning(f"⚠️ Cola de auditoría llena - {self.dropped} registros descartados")
+
+    def _writer(self):
+        """Hilo escritor: agrupa registros y los vuelca por tamaño o por tiempo"""
+        try:
+            self.sink.open()
+        except Exception as e:
+            self.logger.error(f"❌ No se pudo abrir el destino de auditoría: {e}")
+            return
+
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self.stopping.is_set() and self.queue.empty()):
+            try:
+                entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if entry is not None:
+                    batch.append(entry)
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or self.stopping.is_set()):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+        if batch:
+            self._flush(batch)
+        self.sink.close()
+
+    def _flush(self, batch):
+        try:
+            self.sink.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            self.logger.error(f"❌ Error escribiendo {len(batch)} registros de auditoría: {e}")
+
+    def close(self, timeout=5.0):
+        """Volcar lo pendiente y detener el hilo escritor"""
+        self.stopping.set()
+        try:
+            # Despertar al hilo escritor si está esperando registros
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+
+class NullAuditLog:
+    """Auditoría desactivada: no guarda nada"""
+
+    written = 0
+    dropped = 0
+
+    @property
+    def enabled(self):
+        return False
+
+    def record(self, command, outcome, **fields):
+        pass
+
+    def close(self, timeout=5.0):
+        pass
+
+
+def create_audit_log(backend=AUDIT_BACKEND, path=AUDIT_PATH):
+    """Crear el registro de auditoría configurado ("jsonl", "sqlite" o "none")"""
+    if backend == "none":
+        return NullAuditLog()
+    if backend not in SINKS:
+        raise ValueError(f"Destino de auditoría desconocido: {backend} (opciones: none, {', '.join(SINKS)})")
+    return AuditLog(SINKS[backend](path))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Comparar los backends ServerQuery con la misma carga de comandos
+
+Uso:
+    python benchmark.py --iterations 200
+    python benchmark.py --backends socket --host 127.0.0.1 --port 10011
+"""
+
+import argparse
+import logging
+import time
+from config import TS3_HOST, TS3_QUERY_PORT, TS3_USERNAME, TS3_PASSWORD, TS3_SERVER_ID
+from serverquery import BACKENDS, QueryConnection, create_backend, is_ok
+
+# Carga de lectura usada por el bot en cada comando (no modifica el servidor)
+COMMAND_MIX = ("whoami", "clientlist", "serverinfo")
+
+
+def percentile(samples, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def run_backend(backend, args):
+    """Ejecutar la carga con un backend y devolver sus resultados"""
+    # Comprobar antes de conectar que el backend está disponible (ImportError si falta ts3)
+    create_backend(backend)
+    query = QueryConnection(backend, args.host, args.port, args.username, args.password,
+                            virtual_server_id=args.server_id)
+
+    start = time.perf_counter()
+    if not query.connect(pipeline=True):
+        return None
+    connect_time = time.perf_counter() - start
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        command = COMMAND_MIX[i % len(COMMAND_MIX)]
+        command_start = time.perf_counter()
+        if not is_ok(query.send_command(command)):
+            errors += 1
+        latencies.append(time.perf_counter() - command_start)
+    sequential_time = time.perf_counter() - start
+
+    # La misma carga en tandas (una ida y vuelta por tanda si el backend lo permite)
+    start = time.perf_counter()
+    for offset in range(0, args.iterations, args.batch):
+        count = min(args.batch, args.iterations - offset)
+        commands = [COMMAND_MIX[(offset + i) % len(COMMAND_MIX)] for i in range(count)]
+        errors += sum(1 for response in query.send_commands(commands) if not is_ok(response))
+    batch_time = time.perf_counter() - start
+
+    query.disconnect()
+
+    latencies.sort()
+    return {
+        "connect_ms": connect_time * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "sequential_cmd_s": args.iterations / sequential_time if sequential_time else 0.0,
+        "batch_cmd_s": args.iterations / batch_time if batch_time else 0.0,
+        "errors": errors
+    }
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de backends ServerQuery")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--host", default=TS3_HOST)
+    parser.add_argument("--port", type=int, default=TS3_QUERY_PORT)
+    parser.add_argument("--username", default=TS3_USERNAME)
+    parser.add_argument("--password", default=TS3_PASSWORD)
+    parser.add_argument("--server-id", type=int, default=TS3_SERVER_ID, help="Servidor virtual (use sid=N)")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=10, help="Comandos por tanda en la prueba por tandas")
+    args = parser.parse_args()
+    if not args.username or not args.password:
+        parser.error("faltan las credenciales: --username/--password o TS3_USERNAME/TS3_PASSWORD")
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print(f"{'backend':<8} {'conexión':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'cmd/s':>8} {'tanda/s':>8} {'errores':>8}")
+    for backend in args.backends:
+        try:
+            result = run_backend(backend, args)
+        except ImportError as e:
+            print(f"{backend:<8} no disponible: {e}")
+            continue
+
+        if result is None:
+            print(f"{backend:<8} no se pudo conectar")
+            continue
+
+        print(
+            f"{backend:<8} {result['connect_ms']:>8.1f}ms "
+            f"{result['p50_ms']:>6.2f}ms {result['p95_ms']:>6.2f}ms {result['p99_ms']:>6.2f}ms "
+            f"{result['sequential_cmd_s']:>8.0f} {result['batch_cmd_s']:>8.0f} {result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
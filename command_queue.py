@@ -0,0 +1,258 @@
+"""
+Cola de salida de comandos ServerQuery con clases de prioridad
+
+Clases (de mayor a menor prioridad):
+  - control: keepalive y comandos internos de la conexión
+  - interactive: respuestas a usuarios (mensajes privados, avisos)
+  - bulk: acciones masivas (!mp, !mm, !mk)
+
+La cola se vacía por tramos desde el bucle principal, así los eventos que
+llegan durante una acción masiva se atienden antes de que termine.
+"""
+
+import time
+import logging
+from collections import deque
+from config import OUTBOUND_WINDOW, OUTBOUND_DRAIN_BUDGET, OUTBOUND_STARVATION_LIMIT
+from serverquery import is_ok
+
+PRIORITY_CONTROL = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_CONTROL: "control",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BULK: "bulk"
+}
+
+
+class OutboundCommand:
+    """Comando pendiente de envío"""
+
+    __slots__ = ("command", "priority", "callback", "enqueued_at", "sequence")
+
+    def __init__(self, command, priority, callback, sequence=0):
+        self.command = command
+        self.priority = priority
+        self.callback = callback
+        self.enqueued_at = time.monotonic()
+        # Orden de llegada a la cola (para saber qué se encoló antes o después)
+        self.sequence = sequence
+
+
+class ClassMetrics:
+    """Métricas de una clase de prioridad"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.sent = 0
+        self.errors = 0
+        self.promoted = 0  # envíos concedidos por protección contra inanición
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def snapshot(self, depth):
+        """Devolver las métricas como diccionario"""
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "errors": self.errors,
+            "promoted": self.promoted,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "avg_wait_ms": self.total_wait / self.sent * 1000 if self.sent else 0.0,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+
+class CommandBatch:
+    """Conjunto de comandos de una acción masiva con su progreso"""
+
+    def __init__(self, name, on_complete=None):
+        self.name = name
+        self.on_complete = on_complete
+        # Llamado tras cada resultado y al sellar (p. ej. para informar del progreso)
+        self.on_progress = None
+        self.total = 0
+        self.ok = 0
+        self.failed = 0
+        self.sealed = False
+        # Resultado por objetivo, en orden de respuesta: (objetivo, éxito)
+        self.results = []
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.ok + self.failed
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def add(self, scheduler, command, target, priority=PRIORITY_BULK, on_result=None):
+        """Encolar un comando de la acción para un objetivo"""
+        self.total += 1
+
+        def callback(response):
+            success = is_ok(response)
+            if success:
+                self.ok += 1
+            else:
+                self.failed += 1
+            self.results.append((target, success))
+            if on_result:
+                on_result(target, success)
+            self._check_complete()
+            if self.on_progress:
+                self.on_progress(self)
+
+        scheduler.submit(command, priority, callback)
+
+    def seal(self):
+        """Indicar que no se añadirán más comandos"""
+        self.sealed = True
+        self._check_complete()
+        if self.on_progress:
+            self.on_progress(self)
+
+    def _check_complete(self):
+        if self.sealed and not self.finished and self.done >= self.total:
+            self.finished_at = time.time()
+            if self.on_complete:
+                self.on_complete(self)
+
+
+class OutboundScheduler:
+    """Planificador de salida con prioridades y protección contra inanición"""
+
+    def __init__(self, query, window=OUTBOUND_WINDOW, budget=OUTBOUND_DRAIN_BUDGET,
+                 starvation_limit=OUTBOUND_STARVATION_LIMIT):
+        self.query = query
+        self.window = max(1, window)
+        self.budget = budget
+        self.starvation_limit = starvation_limit
+        self.queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self.metrics = {priority: ClassMetrics() for priority in PRIORITY_NAMES}
+        # Envíos seguidos de clases superiores mientras había trabajo de menor prioridad
+        self.bypassed = 0
+        # Número de secuencia del próximo comando encolado
+        self.sequence = 0
+        # Llamado con cada comando tras enviarlo y procesar su respuesta
+        self.on_sent = None
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, command, priority=PRIORITY_BULK, callback=None):
+        """Encolar un comando; el callback recibe la respuesta (o None)"""
+        entry = OutboundCommand(command, priority, callback, self.sequence)
+        self.sequence += 1
+        queue = self.queues[priority]
+        queue.append(entry)
+
+        metrics = self.metrics[priority]
+        metrics.submitted += 1
+        if len(queue) > metrics.max_depth:
+            metrics.max_depth = len(queue)
+        return entry
+
+    def pending(self, priority=None):
+        """Número de comandos pendientes (en total o de una clase)"""
+        if priority is not None:
+            return len(self.queues[priority])
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _next(self):
+        """Elegir el siguiente comando a enviar"""
+        waiting = [priority for priority in sorted(self.queues) if self.queues[priority]]
+        if not waiting:
+            return None
+
+        priority = waiting[0]
+        if len(waiting) > 1:
+            if self.bypassed >= self.starvation_limit:
+                # Conceder un envío a la clase inferior que más tiempo lleva esperando
+                priority = min(waiting[1:], key=lambda p: self.queues[p][0].enqueued_at)
+                self.metrics[priority].promoted += 1
+                self.bypassed = 0
+            else:
+                self.bypassed += 1
+        else:
+            self.bypassed = 0
+
+        return self.queues[priority].popleft()
+
+    def drain(self, budget=None):
+        """Enviar hasta 'budget' comandos por orden de prioridad; devuelve cuántos se enviaron"""
+        if budget is None:
+            budget = self.budget
+        sent = 0
+        while sent < budget and self.query.connected:
+            entries = []
+            while len(entries) < min(self.window, budget - sent):
+                entry = self._next()
+                if entry is None:
+                    break
+                entries.append(entry)
+                # Un comando de control no espera a completar la ventana
+                if entry.priority == PRIORITY_CONTROL:
+                    break
+            if not entries:
+                break
+
+            now = time.monotonic()
+            for entry in entries:
+                wait = now - entry.enqueued_at
+                metrics = self.metrics[entry.priority]
+                metrics.total_wait += wait
+                if wait > metrics.max_wait:
+                    metrics.max_wait = wait
+
+            if len(entries) == 1:
+                responses = [self.query.send_command(entries[0].command)]
+            else:
+                responses = self.query.send_commands([entry.command for entry in entries])
+
+            for entry, response in zip(entries, responses):
+                metrics = self.metrics[entry.priority]
+                metrics.sent += 1
+                if not is_ok(response):
+                    metrics.errors += 1
+                if entry.callback:
+                    try:
+                        entry.callback(response)
+                    except Exception as e:
+                        self.logger.error(f"Error procesando respuesta de '{entry.command.split(' ', 1)[0]}': {e}")
+                if self.on_sent:
+                    self.on_sent(entry)
+            sent += len(entries)
+        return sent
+
+    def discard(self):
+        """Descartar lo pendiente (p. ej. al perder la conexión), avisando con respuesta None"""
+        for queue in self.queues.values():
+            while queue:
+                entry = queue.popleft()
+                if entry.callback:
+                    try:
+                        entry.callback(None)
+                    except Exception as e:
+                        self.logger.error(f"Error descartando comando: {e}")
+
+    def snapshot(self):
+        """Métricas por clase como diccionario"""
+        return {
+            name: self.metrics[priority].snapshot(len(self.queues[priority]))
+            for priority, name in PRIORITY_NAMES.items()
+        }
+
+    def summary(self):
+        """Resumen de una línea para el log"""
+        parts = []
+        for name, data in self.snapshot().items():
+            parts.append(
+                f"{name}: {data['sent']} enviados, espera media {data['avg_wait_ms']:.1f} ms "
+                f"(máx {data['max_wait_ms']:.1f} ms), pendientes {data['depth']}"
+            )
+        return "; ".join(parts)
@@ -6,12 +6,80 @@ Configuración del bot de TeamSpeak 3
 TS3_HOST = "142.4.207.51"
 TS3_PORT = 20131
 TS3_QUERY_PORT = 10002
-TS3_USERNAME = "HarmonianBOT"
-TS3_PASSWORD = "TmOw4xyqPtBB"
+# Credenciales fuera del código: variables TS3_USERNAME/TS3_PASSWORD o la tabla [ts3] de bot.toml
+TS3_USERNAME = ""
+TS3_PASSWORD = ""
+TS3_SERVER_ID = None  # servidor virtual a seleccionar con "use" (None = el asignado al usuario query)
+
+# Permisos por comando: grupo de servidor requerido (o lista de grupos; None = sin restricciones)
+COMMAND_PERMISSIONS = {
+    "!mp": "25770",
+    "!mm": "25771",
+    "!mk": "25787",
+    "!test": None
+}
 
 # Configuración de reconexión
-RECONNECT_DELAY = 30  # segundos
+RECONNECT_DELAY = 30.0  # segundos
 MAX_RECONNECT_ATTEMPTS = 10
 
+# Configuración de la conexión ServerQuery
+QUERY_BACKEND = "socket"  # "socket" (directo) o "ts3" (paquete ts3)
+COMMAND_TIMEOUT = 2.0  # segundos de espera por la respuesta de un comando
+QUERY_CACHE_TTL = 2.0  # segundos que se reutilizan clientlist/clientinfo
+KEEPALIVE_DETECTION_TIME = 30.0  # segundos máximos hasta detectar una conexión muerta
+TCP_KEEPALIVE = True  # keepalive TCP del sistema operativo en el socket de query
+
+# Cola de salida de comandos (prioridades: control > interactivo > masivo)
+OUTBOUND_WINDOW = 4  # comandos enviados juntos por escritura
+OUTBOUND_DRAIN_BUDGET = 20  # comandos por vuelta del bucle antes de atender eventos
+OUTBOUND_STARVATION_LIMIT = 8  # envíos de mayor prioridad antes de conceder uno a una clase inferior
+
+# Auditoría de comandos (escritura por lotes en segundo plano)
+AUDIT_BACKEND = "jsonl"  # "jsonl", "sqlite" o "none"
+AUDIT_PATH = "audit.jsonl"
+AUDIT_QUEUE_SIZE = 10000  # registros en memoria antes de descartar
+AUDIT_BATCH_SIZE = 200  # registros por escritura
+AUDIT_FLUSH_INTERVAL = 2.0  # segundos máximos entre escrituras
+
+# Trazado de rendimiento (desactivado salvo con main.py --trace o TS3_TRACE)
+TRACE_ENABLED = False
+TRACE_PATH = "trace.json"  # formato Chrome trace-event (chrome://tracing, ui.perfetto.dev)
+TRACE_MAX_EVENTS = 200000  # eventos en memoria (se descartan los más antiguos)
+PROFILE_EVERY = 0  # cProfile de 1 de cada N comandos (0 = nunca)
+PROFILE_DIR = "profiles"
+
+# Tareas programadas (ver scheduler.py para el formato)
+SCHEDULER_TICK = 1.0  # resolución de la rueda de temporizadores en segundos
+SCHEDULED_JOBS = []
+
+# Detección de inactividad (AFK)
+AFK_ENABLED = False
+AFK_SWEEP_INTERVAL = 30.0  # segundos entre consultas de clientlist -times -away -voice
+AFK_CHANNEL_ID = None  # canal al que se mueven los inactivos (None = no mover)
+AFK_MOVE_AFTER = 900.0  # segundos de inactividad antes de mover
+AFK_AWAY_MOVE_AFTER = 60.0  # segundos antes de mover si está ausente o con el sonido silenciado (0 = igual que AFK_MOVE_AFTER)
+AFK_KICK_AFTER = 0.0  # segundos de inactividad antes de expulsar (0 = nunca)
+AFK_KICK_MESSAGE = "Inactivo demasiado tiempo"
+
+# API HTTP de control (desactivada salvo con main.py --control-api o TS3_CONTROL_API)
+CONTROL_API_ENABLED = False
+CONTROL_API_HOST = "127.0.0.1"  # solo local por defecto
+CONTROL_API_PORT = 8787
+CONTROL_API_TOKEN = ""  # obligatorio; mejor por la variable de entorno TS3_CONTROL_TOKEN
+CONTROL_API_MAX_JOBS = 100  # trabajos recientes que se conservan para consultar
+
+# Archivo de configuración (sobrescribe estos valores; ver settings.py y bot.example.toml)
+CONFIG_PATH = "bot.toml"
+CONFIG_RELOAD_INTERVAL = 5.0  # segundos entre comprobaciones del archivo (0 = sin recarga en caliente)
+
+# Arranque rápido: activar comandos antes de mostrar información del servidor
+FAST_START = False
+
 # Configuración de logging
 LOG_LEVEL = "INFO"
+
+# Sobrescrituras del archivo TOML y de las variables de entorno TS3_*: se aplican
+# al importar este módulo, antes de que los demás lean los valores
+from settings import apply_overrides
+apply_overrides(globals())
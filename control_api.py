@@ -0,0 +1,393 @@
+"""
+API HTTP/JSON de control del bot (local, con token)
+
+Expone las mismas operaciones que !mp, !mm, !mk y !test sin pasar por el chat:
+
+    GET  /status                 estado de la conexión, colas y estadísticas
+    GET  /clients                clientes conectados (desde la caché de clientlist)
+    POST /jobs                   {"action": "poke", "message": "..."}
+                                 {"action": "move", "channel_id": "12"}
+                                 {"action": "kick", "message": "..."}
+    GET  /jobs                   últimos trabajos
+    GET  /jobs/<id>              estado de un trabajo
+    GET  /jobs/<id>/stream       progreso en NDJSON (una línea por cambio) hasta terminar
+
+Todas las peticiones llevan `Authorization: Bearer <token>`.
+
+El servidor HTTP corre en hilos propios, pero nunca toca la conexión
+ServerQuery: cada operación se deja en una cola que el bucle principal vacía
+en process_pending(), igual que los eventos.
+"""
+
+import hmac
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import CONTROL_API_HOST, CONTROL_API_PORT, CONTROL_API_TOKEN, CONTROL_API_MAX_JOBS
+from serverquery import escape
+
+# Espera máxima a que el bucle principal atienda una petición
+CALL_TIMEOUT = 10
+# Intervalo de líneas de "sigo vivo" en el progreso en streaming
+STREAM_HEARTBEAT = 15
+
+
+class ControlJob:
+    """Acción masiva lanzada desde la API"""
+
+    def __init__(self, action, arguments):
+        self.id = uuid.uuid4().hex[:12]
+        self.action = action
+        self.arguments = arguments
+        self.status = "queued"
+        self.total = 0
+        self.ok = 0
+        self.failed = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Se incrementa en cada cambio (el streaming espera a que cambie)
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.status in ("finished", "failed")
+
+    def snapshot(self):
+        """Estado del trabajo como diccionario"""
+        return {
+            "job_id": self.id,
+            "action": self.action,
+            "arguments": self.arguments,
+            "status": self.status,
+            "total": self.total,
+            "done": self.ok + self.failed,
+            "ok": self.ok,
+            "failed": self.failed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    """Manejador HTTP: autentica, valida y delega en ControlAPI"""
+
+    server_version = "TS3BotControl/1.0"
+
+    def log_message(self, format, *args):
+        self.server.api.logger.debug("🌐 " + format % args)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        expected = f"Bearer {self.server.api.token}".encode("utf-8")
+        received = self.headers.get("Authorization", "").encode("utf-8")
+        if hmac.compare_digest(received, expected):
+            return True
+        self.send_json(401, {"error": "token inválido"})
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        api = self.server.api
+        parts = [part for part in self.path.split("?", 1)[0].split("/") if part]
+        try:
+            if parts == ["status"]:
+                self.send_json(200, api.call(api.status))
+            elif parts == ["clients"]:
+                self.send_json(200, api.call(api.clients))
+            elif parts == ["jobs"]:
+                self.send_json(200, api.list_jobs())
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = api.get_job(parts[1])
+                if job is None:
+                    self.send_json(404, {"error": "trabajo no encontrado"})
+                else:
+                    self.send_json(200, api.job_snapshot(job))
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream":
+                job = api.get_job(parts[1])
+                if job is None:
+                    self.send_json(404, {"error": "trabajo no encontrado"})
+                else:
+                    self.stream_job(job)
+            else:
+                self.send_json(404, {"error": "ruta desconocida"})
+        except FutureTimeout:
+            self.send_json(504, {"error": "el bot no respondió a tiempo"})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        api = self.server.api
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            self.send_json(404, {"error": "ruta desconocida"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            job = api.create_job(request)
+        except (ValueError, TypeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        try:
+            api.call(lambda: api.start_job(job))
+        except FutureTimeout:
+            # El trabajo ya está en cola: se ejecutará cuando el bucle quede libre
+            pass
+        status = 503 if job.status == "failed" else 202
+        self.send_json(status, dict(api.job_snapshot(job),
+                                    status_url=f"/jobs/{job.id}", stream_url=f"/jobs/{job.id}/stream"))
+
+    def stream_job(self, job):
+        """Enviar el progreso como NDJSON hasta que el trabajo termine"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        api = self.server.api
+        version = -1
+        while True:
+            with api.changed:
+                api.changed.wait_for(lambda: job.version != version or api.stopping, STREAM_HEARTBEAT)
+                version = job.version
+                snapshot = job.snapshot()
+            try:
+                self.wfile.write((json.dumps(snapshot, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                return
+            if job.finished or api.stopping:
+                return
+
+
+class ControlAPI:
+    """Servidor HTTP de control con cola de operaciones hacia el bucle principal"""
+
+    def __init__(self, host=CONTROL_API_HOST, port=CONTROL_API_PORT, token=CONTROL_API_TOKEN,
+                 max_jobs=CONTROL_API_MAX_JOBS):
+        if not token:
+            raise ValueError("La API de control requiere un token (CONTROL_API_TOKEN o TS3_CONTROL_TOKEN)")
+        self.host = host
+        self.port = port
+        self.token = token
+        self.max_jobs = max_jobs
+        self.bot = None
+        self.server = None
+        self.thread = None
+        self.stopping = False
+        self.logger = logging.getLogger(__name__)
+
+        # Operaciones pendientes (hilos HTTP -> bucle principal) y aviso para despertarlo
+        self.inbox = queue.SimpleQueue()
+        self.wakeup = threading.Event()
+
+        # Trabajos recientes; 'changed' protege su estado y avisa al streaming
+        self.jobs = OrderedDict()
+        self.changed = threading.Condition()
+
+    @property
+    def enabled(self):
+        return True
+
+    def start(self, bot):
+        """Abrir el puerto y atender peticiones en segundo plano"""
+        self.bot = bot
+        self.server = ThreadingHTTPServer((self.host, self.port), ControlRequestHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="control-api", daemon=True)
+        self.thread.start()
+        self.logger.info(f"🌐 API de control escuchando en http://{self.host}:{self.port}")
+
+    def stop(self):
+        """Cerrar el servidor y liberar las peticiones en curso"""
+        with self.changed:
+            self.stopping = True
+            self.changed.notify_all()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.discard()
+
+    # --- Lado HTTP (hilos del servidor) ---
+
+    def call(self, function, timeout=CALL_TIMEOUT):
+        """Ejecutar function() en el bucle principal y esperar su resultado"""
+        future = Future()
+        self.inbox.put((function, future))
+        self.wakeup.set()
+        return future.result(timeout)
+
+    def create_job(self, request):
+        """Validar la petición y registrar el trabajo"""
+        action = request.get("action")
+        if action in ("poke", "kick"):
+            message = request.get("message")
+            if not isinstance(message, str) or not message.strip():
+                raise ValueError(f"'{action}' requiere 'message'")
+            arguments = {"message": message}
+        elif action == "move":
+            channel_id = request.get("channel_id")
+            if not str(channel_id or "").isdigit():
+                raise ValueError("'move' requiere 'channel_id' numérico")
+            arguments = {"channel_id": str(channel_id)}
+        else:
+            raise ValueError(f"Acción desconocida {action!r} (opciones: poke, move, kick)")
+
+        job = ControlJob(action, arguments)
+        with self.changed:
+            self.jobs[job.id] = job
+            # Olvidar los trabajos terminados más antiguos
+            while len(self.jobs) > self.max_jobs:
+                oldest = next((key for key, old in self.jobs.items() if old.finished), None)
+                if oldest is None:
+                    break
+                del self.jobs[oldest]
+        return job
+
+    def get_job(self, job_id):
+        with self.changed:
+            return self.jobs.get(job_id)
+
+    def job_snapshot(self, job):
+        with self.changed:
+            return job.snapshot()
+
+    def list_jobs(self):
+        with self.changed:
+            return [job.snapshot() for job in self.jobs.values()]
+
+    # --- Lado del bot (bucle principal) ---
+
+    def pending(self):
+        return not self.inbox.empty()
+
+    def drain(self):
+        """Atender las operaciones pendientes; devuelve cuántas se atendieron"""
+        self.wakeup.clear()
+        handled = 0
+        while True:
+            try:
+                function, future = self.inbox.get_nowait()
+            except queue.Empty:
+                return handled
+            handled += 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function())
+            except Exception as e:
+                self.logger.error(f"Error atendiendo petición de la API: {e}")
+                future.set_exception(e)
+
+    def discard(self):
+        """Responder con error a lo pendiente (al detener el bot)"""
+        while True:
+            try:
+                function, future = self.inbox.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(ConnectionError("Bot detenido"))
+
+    def wait(self, timeout):
+        """Pausa del bucle principal que termina en cuanto llega una petición"""
+        self.wakeup.wait(timeout)
+
+    def status(self):
+        bot = self.bot
+        return {
+            "connected": bot.connected,
+            "server_id": bot.server_id,
+            "backend": bot.query.backend_name,
+            "query": bot.query.stats.snapshot(),
+            "outbound": bot.outbound.snapshot(),
+            "afk": bot.afk.summary() if bot.afk.enabled else None,
+            "audit": {"written": bot.audit.written, "dropped": bot.audit.dropped}
+        }
+
+    def clients(self):
+        return [
+            {"clid": client.get('clid'), "cid": client.get('cid'), "nickname": client.get('client_nickname')}
+            for client in self.bot.get_all_clients()
+        ]
+
+    def start_job(self, job):
+        """Lanzar la acción masiva del trabajo y enlazar su progreso"""
+        bot = self.bot
+        if not bot.connected:
+            self._update(job, status="failed", error="bot desconectado")
+            return
+        initiator = "🌐 API"
+        if job.action == "poke":
+            message = job.arguments["message"]
+            batch = bot.start_mass_poke(escape(message), message, initiator)
+        elif job.action == "move":
+            batch = bot.start_mass_move(job.arguments["channel_id"], initiator)
+        else:
+            message = job.arguments["message"]
+            batch = bot.start_mass_kick(escape(message), message, initiator)
+        batch.on_progress = lambda batch: self._update_from_batch(job, batch)
+        self._update_from_batch(job, batch)
+
+    def _update_from_batch(self, job, batch):
+        self._update(
+            job,
+            status="finished" if batch.finished else "running",
+            total=batch.total,
+            ok=batch.ok,
+            failed=batch.failed
+        )
+
+    def _update(self, job, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            if job.finished and job.finished_at is None:
+                job.finished_at = time.time()
+            job.version += 1
+            self.changed.notify_all()
+
+
+class NullControlAPI:
+    """API de control desactivada"""
+
+    @property
+    def enabled(self):
+        return False
+
+    def start(self, bot):
+        pass
+
+    def stop(self):
+        pass
+
+    def pending(self):
+        return False
+
+    def drain(self):
+        return 0
+
+    def wait(self, timeout):
+        time.sleep(timeout)
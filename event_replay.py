@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Grabación y reproducción del flujo ServerQuery para pruebas de carga
+
+Grabar (desde main.py):
+    python main.py --record trazas/raid.jsonl
+
+Generar una ráfaga sintética:
+    python event_replay.py generate trazas/raid.jsonl --users 300 --messages 3 --duration 10
+
+Reproducir contra un servidor falso local:
+    python event_replay.py replay trazas/raid.jsonl --speed 10
+
+Formato de la traza (JSON lines): una cabecera {"dir": "meta", ...} y después
+{"t": segundos desde el inicio, "dir": "in" | "out", "data": texto}.
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from serverquery import LINE_END
+
+TRACE_VERSION = 1
+
+REDACTED = "<redacted>"
+
+# Credenciales que nunca deben llegar a la traza
+REDACT_PATTERNS = [
+    (re.compile(r"^(\r?)login\s+\S+\s+\S+"), rf"\1login {REDACTED} {REDACTED}"),
+    (re.compile(r"client_login_name=\S+"), f"client_login_name={REDACTED}"),
+    (re.compile(r"client_login_password=\S+"), f"client_login_password={REDACTED}")
+]
+
+DEFAULT_RESPONSE = "error id=0 msg=ok"
+
+
+def redact(text):
+    """Eliminar credenciales de un fragmento del flujo"""
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        for pattern, replacement in REDACT_PATTERNS:
+            line = pattern.sub(replacement, line)
+        lines[index] = line
+    return "\n".join(lines)
+
+
+def percentile(samples, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+class TraceRecorder:
+    """Graba el flujo de bytes ServerQuery en un archivo de traza con marcas de tiempo"""
+
+    def __init__(self, path):
+        self.path = path
+        self.start = time.monotonic()
+        self.file = open(path, "w", encoding="utf-8")
+        self._write({"dir": "meta", "version": TRACE_VERSION, "started": time.time()})
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"⏺️ Grabando flujo ServerQuery en {path}")
+
+    def record(self, direction, data):
+        """Guardar un fragmento enviado ('out') o recibido ('in')"""
+        if not self.file:
+            return
+        # surrogateescape conserva bytes no UTF-8 y fragmentos cortados a mitad de carácter
+        text = redact(data.decode("utf-8", "surrogateescape"))
+        self._write({"t": round(time.monotonic() - self.start, 6), "dir": direction, "data": text})
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        """Cerrar el archivo de traza"""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def load_trace(path):
+    """Leer una traza y devolver (eventos, respuestas por comando)
+
+    eventos: lista de (t, línea notify)
+    respuestas: comando completo -> lista de respuestas, en orden
+    """
+    in_lines = []  # (t, línea)
+    commands = []
+    buffer = ""
+    with open(path, encoding="utf-8") as trace:
+        for raw in trace:
+            record = json.loads(raw)
+            if record["dir"] == "out":
+                commands.extend(line.strip() for line in record["data"].split("\n") if line.strip())
+            elif record["dir"] == "in":
+                buffer += record["data"]
+                *complete, buffer = buffer.split("\n\r")
+                in_lines.extend((record["t"], line.strip()) for line in complete)
+
+    events = []
+    responses = []
+    current = []
+    for t, line in in_lines:
+        if not line or line.startswith("TS3") or line.startswith("Welcome"):
+            continue
+        if line.startswith("notify"):
+            events.append((t, line))
+            continue
+        current.append(line)
+        if line.startswith("error id="):
+            responses.append("\n".join(current))
+            current = []
+
+    # ServerQuery responde en orden: la respuesta i corresponde al comando i
+    by_command = defaultdict(list)
+    for command, response in zip(commands, responses):
+        by_command[command].append(response)
+    return events, by_command
+
+
+class FakeQueryServer:
+    """Servidor ServerQuery local que reproduce los eventos de una traza"""
+
+    def __init__(self, events, responses, speed=1.0):
+        self.events = events
+        self.speed = speed
+        # Respuestas por comando completo y, como alternativa, por nombre de comando
+        self.responses = {command: deque(items) for command, items in responses.items()}
+        self.by_name = {}
+        for command, items in responses.items():
+            self.by_name.setdefault(command.split(" ", 1)[0], items[-1])
+
+        self.commands = Counter()
+        self.sent_at = []  # momento de envío de cada evento
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.conn = None
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.registered = threading.Event()
+
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _send(self, text):
+        # Las respuestas de varias líneas se guardan unidas con "\n"
+        data = LINE_END.join(line.encode("utf-8", "surrogateescape") for line in text.split("\n"))
+        with self.lock:
+            self.conn.sendall(data + LINE_END)
+
+    def _respond(self, command):
+        queue = self.responses.get(command)
+        if queue:
+            # La última respuesta grabada se reutiliza si el bot repite el comando
+            return queue.popleft() if len(queue) > 1 else queue[0]
+        return self.by_name.get(command.split(" ", 1)[0], DEFAULT_RESPONSE)
+
+    def _serve(self):
+        self.conn, _ = self.server.accept()
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send("TS3")
+        self._send("Welcome to the TeamSpeak 3 ServerQuery interface (replay).")
+        threading.Thread(target=self._play, daemon=True).start()
+
+        buffer = b""
+        while True:
+            try:
+                data = self.conn.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                command = line.decode("utf-8", "surrogateescape").strip()
+                if not command:
+                    continue
+                name = command.split(" ", 1)[0]
+                self.commands[name] += 1
+                if name == "servernotifyregister":
+                    self.registered.set()
+                if name in ("logout", "quit"):
+                    self._send(DEFAULT_RESPONSE)
+                    continue
+                self._send(self._respond(command))
+
+    def _play(self):
+        """Enviar los eventos respetando los intervalos grabados (divididos por speed)"""
+        self.registered.wait(10)
+        if not self.events:
+            self.finished.set()
+            return
+        first = self.events[0][0]
+        start = time.perf_counter()
+        for t, line in self.events:
+            delay = (t - first) / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            self.sent_at.append(time.perf_counter())
+            try:
+                self._send(line)
+            except OSError:
+                break
+        self.finished.set()
+
+    def close(self):
+        """Cerrar el servidor"""
+        for sock in (self.conn, self.server):
+            if sock:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+
+def replay(path, speed=1.0, backend="socket", idle_timeout=2.0):
+    """Reproducir una traza contra el bot y devolver el informe"""
+    from simple_bot import SimpleTeamSpeakBot
+    from audit import NullAuditLog
+
+    events, responses = load_trace(path)
+    server = FakeQueryServer(events, responses, speed)
+
+    bot = SimpleTeamSpeakBot(fast_start=True, backend=backend, audit=NullAuditLog())
+    bot.query.host = "127.0.0.1"
+    bot.query.port = server.port
+    bot.server_info_shown = True  # no imprimir la información del servidor durante la prueba
+
+    # Medir la latencia desde que el servidor envía el evento hasta que el bot termina de manejarlo
+    latencies = []
+    handle_event = bot.handle_event
+
+    def timed_handle_event(event_data):
+        handle_event(event_data)
+        index = len(latencies)
+        if index < len(server.sent_at):
+            latencies.append(time.perf_counter() - server.sent_at[index])
+
+    bot.handle_event = timed_handle_event
+
+    start = time.perf_counter()
+    if not bot.connect():
+        server.close()
+        raise ConnectionError("No se pudo conectar al servidor de reproducción")
+
+    # Seguir hasta que se hayan enviado todos los eventos y el bot lleve un rato sin trabajo
+    last_activity = time.perf_counter()
+    while True:
+        if bot.process_pending(0.05) or bot.outbound.pending():
+            last_activity = time.perf_counter()
+        if server.finished.is_set() and time.perf_counter() - last_activity > idle_timeout:
+            break
+        if not bot.connected:
+            break
+    elapsed = time.perf_counter() - start
+
+    bot.disconnect()
+    server.close()
+
+    latencies.sort()
+    return {
+        "events_sent": len(server.sent_at),
+        "events_handled": len(latencies),
+        "events_dropped": len(server.sent_at) - len(latencies),
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "outbound_commands": dict(server.commands.most_common()),
+        "elapsed_s": elapsed
+    }
+
+
+def generate(path, users=300, messages=3, duration=10.0, commands=("!test", "!mp hola", "!xx"), seed=0):
+    """Generar una traza sintética: 'users' clientes envían 'messages' comandos en 'duration' segundos"""
+    rng = random.Random(seed)
+    clients = "|".join(
+        f"clid={clid} cid=1 client_database_id={clid} client_nickname=usuario{clid} client_type=0"
+        for clid in range(2, users + 2)
+    )
+    responses = [
+        ("login", "error id=0 msg=ok"),
+        ("whoami", "virtualserver_status=online virtualserver_id=1 client_id=1 client_channel_id=1\n\rerror id=0 msg=ok"),
+        ("clientlist", f"clid=1 cid=1 client_database_id=1 client_nickname=bot client_type=1|{clients}\n\rerror id=0 msg=ok"),
+        ("clientinfo", "cid=1 client_nickname=admin client_servergroups=25770,25771,25787 client_type=0\n\rerror id=0 msg=ok")
+    ]
+
+    with open(path, "w", encoding="utf-8") as trace:
+        trace.write(json.dumps({"dir": "meta", "version": TRACE_VERSION, "synthetic": True}) + "\n")
+        for command, response in responses:
+            trace.write(json.dumps({"t": 0.0, "dir": "out", "data": f"{command}\n\r"}) + "\n")
+            trace.write(json.dumps({"t": 0.0, "dir": "in", "data": f"{response}\n\r"}) + "\n")
+
+        events = sorted(
+            (rng.uniform(0, duration), clid, rng.choice(commands))
+            for clid in range(2, users + 2)
+            for _ in range(messages)
+        )
+        for t, clid, message in events:
+            line = (
+                f"notifytextmessage targetmode=2 msg={message.replace(' ', chr(92) + 's')} target=1 "
+                f"invokerid={clid} invokername=usuario{clid} invokeruid=uid{clid}="
+            )
+            trace.write(json.dumps({"t": round(t, 6), "dir": "in", "data": line + "\n\r"}) + "\n")
+    return len(events)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Grabación y reproducción de trazas ServerQuery")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    replay_parser = subparsers.add_parser("replay", help="Reproducir una traza contra el bot")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Factor de aceleración (1 = tiempo real)")
+    replay_parser.add_argument("--backend", default="socket")
+    replay_parser.add_argument("--verbose", action="store_true", help="Mostrar los logs del bot")
+
+    generate_parser = subparsers.add_parser("generate", help="Generar una traza sintética de ráfaga")
+    generate_parser.add_argument("trace")
+    generate_parser.add_argument("--users", type=int, default=300)
+    generate_parser.add_argument("--messages", type=int, default=3, help="Comandos por usuario")
+    generate_parser.add_argument("--duration", type=float, default=10.0, help="Segundos de la ráfaga")
+    generate_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.action == "generate":
+        count = generate(args.trace, args.users, args.messages, args.duration, seed=args.seed)
+        print(f"✅ Traza generada en {args.trace}: {count} eventos")
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = replay(args.trace, args.speed, args.backend)
+
+    print("\n📊 INFORME DE REPRODUCCIÓN")
+    print("-" * 50)
+    print(f"Eventos enviados:   {report['events_sent']}")
+    print(f"Eventos manejados:  {report['events_handled']}")
+    print(f"Eventos perdidos:   {report['events_dropped']}")
+    print(f"Latencia p50/p95/p99/máx: {report['latency_p50_ms']:.1f} / {report['latency_p95_ms']:.1f} / "
+          f"{report['latency_p99_ms']:.1f} / {report['latency_max_ms']:.1f} ms")
+    print(f"Duración: {report['elapsed_s']:.2f} s")
+    print("Comandos enviados por el bot:")
+    for name, count in report["outbound_commands"].items():
+        print(f"  {name}: {count}")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    main()
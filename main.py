@@ -3,22 +3,133 @@
 Punto de entrada principal para el bot de TeamSpeak 3
 """
 
+import time
+
+# Inicio del proceso: referencia para medir el tiempo de arranque
+PROCESS_START = time.perf_counter()
+
 import sys
 import os
+import argparse
+from config import (TS3_HOST, TS3_PORT, TS3_QUERY_PORT, TS3_USERNAME, TS3_PASSWORD,
+                    FAST_START, QUERY_BACKEND, TRACE_ENABLED, TRACE_PATH, PROFILE_EVERY,
+                    CONTROL_API_ENABLED, CONTROL_API_HOST, CONTROL_API_PORT, CONTROL_API_TOKEN)
 from simple_bot import SimpleTeamSpeakBot
+from serverquery import BACKENDS
+from event_replay import TraceRecorder
+from tracing import tracer
+from control_api import ControlAPI
+
+def parse_args():
+    """Leer argumentos de línea de comandos (los valores por defecto ya incluyen bot.toml y TS3_<NOMBRE>)"""
+    parser = argparse.ArgumentParser(description="Bot de TeamSpeak 3 - ServerQuery")
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        default=FAST_START,
+        help="Activar comandos antes de mostrar la información del servidor"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default=QUERY_BACKEND,
+        help="Backend de conexión ServerQuery"
+    )
+    parser.add_argument(
+        "--record",
+        metavar="TRAZA",
+        default=os.environ.get("TS3_RECORD_FILE"),
+        help="Grabar el flujo ServerQuery (sin credenciales) para reproducirlo con event_replay.py"
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const=TRACE_PATH,
+        metavar="ARCHIVO",
+        default=default_trace_path(),
+        help="Trazar el camino crítico y exportar en formato Chrome trace-event"
+    )
+    parser.add_argument(
+        "--profile-every",
+        type=int,
+        metavar="N",
+        default=PROFILE_EVERY,
+        help="Con --trace, capturar cProfile de 1 de cada N comandos"
+    )
+    parser.add_argument(
+        "--control-api",
+        nargs="?",
+        type=int,
+        const=CONTROL_API_PORT,
+        metavar="PUERTO",
+        default=default_control_port(),
+        help="Activar la API HTTP de control (token en TS3_CONTROL_TOKEN)"
+    )
+    return parser.parse_args()
+
+def default_trace_path():
+    """Ruta de traza según TS3_TRACE ("1" = ruta por defecto) o la configuración"""
+    value = os.environ.get("TS3_TRACE")
+    if value:
+        return TRACE_PATH if value == "1" else value
+    return TRACE_PATH if TRACE_ENABLED else None
+
+def default_control_port():
+    """Puerto de la API de control según TS3_CONTROL_API ("1" = puerto por defecto) o la configuración"""
+    value = os.environ.get("TS3_CONTROL_API")
+    if value:
+        return CONTROL_API_PORT if value == "1" else int(value)
+    return CONTROL_API_PORT if CONTROL_API_ENABLED else None
 
 def main():
     """Función principal"""
+    args = parse_args()
+    
     print("="*60)
     print("🎮 BOT DE TEAMSPEAK 3 - SERVERQUERY")
     print("="*60)
-    print(f"🌐 Servidor: 142.4.207.51:20131")
-    print(f"🔌 Puerto Query: 10002")
-    print(f"👤 Usuario: bote")
+    print(f"🌐 Servidor: {TS3_HOST}:{TS3_PORT}")
+    print(f"🔌 Puerto Query: {TS3_QUERY_PORT}")
+    print(f"👤 Usuario: {TS3_USERNAME or '(sin configurar)'}")
     print("="*60)
     
+    # Las credenciales no están en el código: deben venir del entorno o de bot.toml
+    if not TS3_USERNAME or not TS3_PASSWORD:
+        print("❌ Faltan las credenciales de ServerQuery: define TS3_USERNAME y TS3_PASSWORD "
+              "(variables de entorno o tabla [ts3] de bot.toml)")
+        sys.exit(1)
+    
+    # Trazado opcional del camino crítico
+    if args.trace:
+        tracer.configure(True, args.trace, args.profile_every)
+    
+    # Grabación opcional del flujo ServerQuery
+    recorder = TraceRecorder(args.record) if args.record else None
+    
+    # API HTTP de control opcional
+    control = None
+    if args.control_api is not None:
+        try:
+            control = ControlAPI(
+                CONTROL_API_HOST,
+                args.control_api,
+                os.environ.get("TS3_CONTROL_TOKEN", CONTROL_API_TOKEN)
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    
     # Crear e iniciar el bot
-    bot = SimpleTeamSpeakBot()
+    bot = SimpleTeamSpeakBot(
+        fast_start=args.fast_start,
+        process_start=PROCESS_START,
+        backend=args.backend,
+        recorder=recorder,
+        control=control
+    )
+    
+    # Medir también el tiempo de escritura de logs (solo con trazado activo)
+    tracer.instrument_logging()
     
     try:
         bot.run()
@@ -27,6 +138,10 @@ def main():
     except Exception as e:
         print(f"❌ Error fatal: {e}")
         sys.exit(1)
+    finally:
+        if recorder:
+            recorder.close()
+        tracer.export()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+"""
+Tareas programadas y recurrentes sobre una rueda de temporizadores jerárquica
+
+La rueda avanza desde el bucle principal del bot (sin hilos ni sleeps):
+insertar y cancelar son O(1) y cada tick solo toca los temporizadores que
+vencen en él (más una redistribución amortizada al pasar de nivel).
+
+Las tareas se declaran en config.SCHEDULED_JOBS, por ejemplo:
+
+    SCHEDULED_JOBS = [
+        {"name": "anuncio", "action": "poke", "every": 600, "message": "Evento a las 21:00"},
+        {"name": "consolidar", "action": "move", "at": "20:55", "channel_id": "12"},
+        {"name": "limpieza", "action": "kick", "every": 3600, "idle_seconds": 7200,
+         "message": "Inactivo demasiado tiempo"},
+    ]
+
+Campos:
+  - name: nombre de la tarea (para logs y auditoría)
+  - action: "poke", "move" o "kick"
+  - every: segundos entre ejecuciones (si falta, la tarea se ejecuta una vez)
+  - at: hora diaria "HH:MM" (hora local) para la primera ejecución; con "at" y
+    sin "every" la tarea se repite cada 24 h
+  - delay: segundos hasta la primera ejecución (por defecto, "every")
+  - message: texto del poke o motivo del kick
+  - channel_id: canal de destino de "move"
+  - idle_seconds: solo afectar a clientes inactivos al menos este tiempo
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta
+from config import SCHEDULER_TICK, SCHEDULED_JOBS
+from serverquery import escape
+
+WHEEL_SLOTS = 64
+WHEEL_LEVELS = 4
+
+ACTIONS = ("poke", "move", "kick")
+
+
+class Timer:
+    """Temporizador de la rueda"""
+
+    __slots__ = ("expires", "callback", "cancelled")
+
+    def __init__(self, expires, callback):
+        self.expires = expires
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancelar (se descarta al llegar a su ranura)"""
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Rueda de temporizadores jerárquica (WHEEL_LEVELS niveles de WHEEL_SLOTS ranuras)"""
+
+    def __init__(self, tick=SCHEDULER_TICK, now=None):
+        self.tick = tick
+        self.current_tick = 0
+        self.origin = time.monotonic() if now is None else now
+        self.wheels = [[[] for _ in range(WHEEL_SLOTS)] for _ in range(WHEEL_LEVELS)]
+        self.count = 0
+
+    def schedule(self, delay, callback):
+        """Programar callback() dentro de 'delay' segundos (redondeado al tick)"""
+        ticks = max(1, int(round(delay / self.tick)))
+        timer = Timer(self.current_tick + ticks, callback)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def _place(self, timer):
+        delta = timer.expires - self.current_tick
+        for level in range(WHEEL_LEVELS):
+            if delta < WHEEL_SLOTS ** (level + 1) or level == WHEEL_LEVELS - 1:
+                # Más allá del último nivel: se recoloca al volver a bajar en cascada
+                expires = min(timer.expires, self.current_tick + WHEEL_SLOTS ** WHEEL_LEVELS - 1)
+                slot = (expires // WHEEL_SLOTS ** level) % WHEEL_SLOTS
+                self.wheels[level][slot].append(timer)
+                return
+
+    def _cascade(self, level):
+        """Bajar los temporizadores de la ranura actual de 'level' al nivel inferior"""
+        slot = (self.current_tick // WHEEL_SLOTS ** level) % WHEEL_SLOTS
+        timers = self.wheels[level][slot]
+        self.wheels[level][slot] = []
+        for timer in timers:
+            if not timer.cancelled:
+                self._place(timer)
+            else:
+                self.count -= 1
+
+    def advance(self, now=None):
+        """Procesar los ticks transcurridos hasta 'now'; devuelve cuántos temporizadores vencieron"""
+        now = time.monotonic() if now is None else now
+        target = int((now - self.origin) / self.tick)
+        fired = 0
+        while self.current_tick < target:
+            self.current_tick += 1
+
+            # Al completar una vuelta de un nivel, bajar la siguiente ranura del nivel superior
+            level = 1
+            while level < WHEEL_LEVELS and self.current_tick % WHEEL_SLOTS ** level == 0:
+                self._cascade(level)
+                level += 1
+
+            slot = self.current_tick % WHEEL_SLOTS
+            timers = self.wheels[0][slot]
+            if not timers:
+                continue
+            self.wheels[0][slot] = []
+            for timer in timers:
+                if timer.expires > self.current_tick:
+                    # Recolocado desde más allá del horizonte: aún no vence
+                    self._place(timer)
+                    continue
+                self.count -= 1
+                if not timer.cancelled:
+                    fired += 1
+                    timer.callback()
+        return fired
+
+
+class ScheduledJob:
+    """Tarea declarada en la configuración"""
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise TypeError(f"se esperaba un diccionario, no {type(spec).__name__}")
+        self.name = spec.get("name") or spec.get("action", "tarea")
+        self.action = spec.get("action")
+        if self.action not in ACTIONS:
+            raise ValueError(f"Tarea '{self.name}': acción desconocida {self.action!r} (opciones: {', '.join(ACTIONS)})")
+
+        self.at = spec.get("at")
+        if self.at is not None:
+            self.at_time = self._parse_at(self.at)
+        self.every = self._seconds(spec, "every", 24 * 3600 if self.at else None)
+        self.delay = self._seconds(spec, "delay", self.every)
+        if self.every is None and self.delay is None and self.at is None:
+            raise ValueError(f"Tarea '{self.name}': falta 'every', 'delay' o 'at'")
+
+        self.message = spec.get("message", "")
+        self.channel_id = spec.get("channel_id")
+        if self.action == "move" and not self.channel_id:
+            raise ValueError(f"Tarea '{self.name}': 'move' requiere channel_id")
+        self.idle_seconds = self._seconds(spec, "idle_seconds", None)
+
+        self.runs = 0
+        self.timer = None
+
+    def _seconds(self, spec, key, default):
+        """Leer un número de segundos positivo (o el valor por defecto si falta)"""
+        value = spec.get(key, default)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"Tarea '{self.name}': '{key}' debe ser un número de segundos mayor que 0, no {value!r}")
+        return value
+
+    def _parse_at(self, value):
+        """Validar una hora "HH:MM" y devolver (hora, minuto)"""
+        try:
+            hour, minute = (int(part) for part in str(value).split(":"))
+        except ValueError:
+            raise ValueError(f"Tarea '{self.name}': 'at' debe tener el formato HH:MM, no {value!r}")
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Tarea '{self.name}': hora fuera de rango en 'at': {value!r}")
+        return hour, minute
+
+    def first_delay(self, now=None):
+        """Segundos hasta la primera ejecución"""
+        if self.at:
+            now = now or datetime.now()
+            hour, minute = self.at_time
+            first = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if first <= now:
+                first += timedelta(days=1)
+            return (first - now).total_seconds()
+        return self.delay
+
+
+class JobScheduler:
+    """Ejecuta tareas programadas sobre las acciones masivas del bot"""
+
+    def __init__(self, bot, job_specs=SCHEDULED_JOBS):
+        self.bot = bot
+        self.wheel = TimerWheel()
+        self.jobs = []
+        self.logger = logging.getLogger(__name__)
+        for spec in job_specs:
+            self.add_job(spec)
+
+    def add_job(self, spec):
+        """Validar y programar una tarea; las tareas inválidas se registran y se ignoran"""
+        try:
+            job = ScheduledJob(spec)
+            job.timer = self.wheel.schedule(job.first_delay(), lambda: self._run(job))
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"❌ Tarea programada inválida: {e}")
+            return None
+        self.jobs.append(job)
+        self.logger.info(f"⏰ Tarea '{job.name}' ({job.action}) programada")
+        return job
+
+    def cancel_all(self):
+        """Cancelar todas las tareas"""
+        for job in self.jobs:
+            if job.timer:
+                job.timer.cancel()
+        self.jobs = []
+
+    def advance(self, now=None):
+        """Avanzar la rueda (llamado en cada vuelta del bucle principal)"""
+        return self.wheel.advance(now)
+
+    def _run(self, job):
+        """Ejecutar una tarea y reprogramarla si es recurrente"""
+        if job.every:
+            job.timer = self.wheel.schedule(job.every, lambda: self._run(job))
+
+        if not self.bot.connected:
+            self.logger.warning(f"⚠️ Tarea '{job.name}' omitida: bot desconectado")
+            return
+
+        job.runs += 1
+        initiator = f"⏰ {job.name}"
+        try:
+            clients = None
+            if job.idle_seconds:
+                clients = [
+                    client for client in self.bot.get_all_clients("-times")
+                    if int(client.get('client_idle_time', 0)) >= job.idle_seconds * 1000
+                ]
+
+            if job.action == "poke":
+                self.bot.start_mass_poke(escape(job.message), job.message, initiator, clients)
+            elif job.action == "move":
+                self.bot.start_mass_move(str(job.channel_id), initiator, clients)
+            elif job.action == "kick":
+                self.bot.start_mass_kick(escape(job.message), job.message, initiator, clients)
+            self.logger.info(f"⏰ Tarea '{job.name}' ejecutada (ejecución {job.runs})")
+        except Exception as e:
+            self.logger.error(f"Error ejecutando tarea '{job.name}': {e}")
@@ -0,0 +1,672 @@
+"""
+Capa de conexión ServerQuery compartida por los bots de TeamSpeak 3
+
+Incluye dos backends con la misma interfaz:
+  - "socket": socket directo con lector por líneas (por defecto, más rápido)
+  - "ts3": paquete ts3 (opcional, solo si está instalado)
+"""
+
+import re
+import socket
+import time
+import logging
+from collections import deque
+from tracing import tracer
+from config import (
+    TS3_HOST, TS3_QUERY_PORT,
+    TS3_USERNAME, TS3_PASSWORD, TS3_SERVER_ID,
+    RECONNECT_DELAY, MAX_RECONNECT_ATTEMPTS,
+    QUERY_BACKEND, COMMAND_TIMEOUT, QUERY_CACHE_TTL,
+    KEEPALIVE_DETECTION_TIME, TCP_KEEPALIVE
+)
+
+try:
+    import ts3
+except ImportError:
+    ts3 = None
+
+# Eventos de chat a los que se suscribe el bot
+NOTIFY_EVENTS = ("textserver", "textchannel", "textprivate")
+
+# Comando barato para comprobar que la conexión sigue viva
+KEEPALIVE_COMMAND = "version"
+
+# Fin de línea del protocolo ServerQuery
+LINE_END = b"\n\r"
+
+# Secuencias de escape del protocolo ServerQuery
+ESCAPE_SEQUENCES = [
+    ("\\", "\\\\"), ("/", "\\/"), (" ", "\\s"), ("|", "\\p"),
+    ("\a", "\\a"), ("\b", "\\b"), ("\f", "\\f"), ("\n", "\\n"),
+    ("\r", "\\r"), ("\t", "\\t"), ("\v", "\\v")
+]
+
+
+def escape(value):
+    """Escapar un valor para enviarlo en un comando ServerQuery"""
+    value = str(value)
+    for char, replacement in ESCAPE_SEQUENCES:
+        value = value.replace(char, replacement)
+    return value
+
+
+UNESCAPE_MAP = {replacement[1]: char for char, replacement in ESCAPE_SEQUENCES}
+UNESCAPE_PATTERN = re.compile(r"\\(.)")
+
+
+def unescape(value):
+    """Deshacer el escape de un valor recibido del servidor"""
+    return UNESCAPE_PATTERN.sub(lambda match: UNESCAPE_MAP.get(match.group(1), match.group(1)), value)
+
+
+def parse_properties(text):
+    """Convertir 'clave=valor clave2=valor2' en un diccionario (valores sin des-escapar)"""
+    properties = {}
+    for part in text.split():
+        key, _, value = part.partition("=")
+        properties[key] = value
+    return properties
+
+
+def parse_list(response):
+    """Convertir la respuesta de un comando de lista (clientlist, channellist...) en una lista de diccionarios"""
+    items = []
+    if not response:
+        return items
+    for line in response.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("error id="):
+            continue
+        for item in line.split("|"):
+            if item:
+                items.append(parse_properties(item))
+    return items
+
+
+def is_ok(response):
+    """Indicar si la respuesta terminó con 'error id=0'"""
+    return bool(response) and "error id=0" in response
+
+
+def enable_tcp_keepalive(sock, detection_time=KEEPALIVE_DETECTION_TIME):
+    """Activar keepalive TCP para que el sistema detecte un servidor caído en 'detection_time' segundos"""
+    if not TCP_KEEPALIVE:
+        return
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Opciones de Linux: sondas tras detection_time/2 sin tráfico, 3 sondas en la otra mitad
+    idle = max(1, int(detection_time // 2))
+    interval = max(1, int(detection_time // 6))
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+    if hasattr(socket, "TCP_USER_TIMEOUT"):
+        # Datos enviados sin confirmar durante más tiempo = conexión caída (error en el lector)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, int(detection_time * 1000))
+
+
+class QueryStats:
+    """Contadores y latencias por comando ServerQuery"""
+
+    def __init__(self):
+        # nombre del comando -> [llamadas, errores, tiempo total, tiempo máximo]
+        self.commands = {}
+        self.cache_hits = 0
+        self.events = 0
+        self.keepalives = 0
+        # Caídas detectadas y segundos desde el último tráfico hasta detectarlas
+        self.disconnects = 0
+        self.last_detection = None
+        self.max_detection = 0.0
+
+    def record(self, command, elapsed, ok):
+        """Registrar la ejecución de un comando"""
+        name = command.split(" ", 1)[0]
+        entry = self.commands.get(name)
+        if entry is None:
+            entry = self.commands[name] = [0, 0, 0.0, 0.0]
+        entry[0] += 1
+        if not ok:
+            entry[1] += 1
+        entry[2] += elapsed
+        if elapsed > entry[3]:
+            entry[3] = elapsed
+
+    def record_disconnect(self, detection):
+        """Registrar una caída y su tiempo de detección"""
+        self.disconnects += 1
+        self.last_detection = detection
+        if detection > self.max_detection:
+            self.max_detection = detection
+
+    def snapshot(self):
+        """Devolver las estadísticas como diccionario"""
+        return {
+            "commands": {
+                name: {
+                    "calls": calls,
+                    "errors": errors,
+                    "avg_ms": total / calls * 1000 if calls else 0.0,
+                    "max_ms": maximum * 1000
+                }
+                for name, (calls, errors, total, maximum) in self.commands.items()
+            },
+            "cache_hits": self.cache_hits,
+            "events": self.events,
+            "keepalives": self.keepalives,
+            "disconnects": self.disconnects,
+            "last_detection_s": self.last_detection,
+            "max_detection_s": self.max_detection
+        }
+
+    def summary(self):
+        """Resumen de una línea para el log"""
+        parts = [
+            f"{name}={calls} ({total / calls * 1000:.1f} ms)"
+            for name, (calls, errors, total, maximum) in sorted(self.commands.items())
+            if calls
+        ]
+        summary = f"{', '.join(parts) or 'sin comandos'}; caché={self.cache_hits}; eventos={self.events}; keepalives={self.keepalives}"
+        if self.disconnects:
+            summary += f"; caídas={self.disconnects} (detección máx {self.max_detection:.1f} s)"
+        return summary
+
+
+def traced_response(command, wait, timeout):
+    """Esperar la respuesta de un comando en su propio span (solo con el trazado activo)"""
+    with tracer.command_span(command, wait=True) as span:
+        response = wait(timeout)
+        # Sin respuesta = timeout o conexión caída
+        span.set(ok=is_ok(response), timeout=response is None)
+    return response
+
+
+class SocketQueryBackend:
+    """Backend ServerQuery sobre socket directo con lectura por líneas"""
+
+    name = "socket"
+
+    def __init__(self):
+        self.sock = None
+        self.buffer = bytearray()
+        self.events = deque()
+        # Respuestas abandonadas por timeout que aún pueden llegar: se descartan al leer
+        # para que cada comando reciba su propia respuesta (como _num_pending_queries en ts3)
+        self.late_responses = 0
+        # Grabador opcional del flujo de bytes (ver event_replay.TraceRecorder)
+        self.recorder = None
+
+    def open(self, host, port, timeout=10):
+        """Abrir la conexión y devolver el mensaje de bienvenida"""
+        self.sock = socket.create_connection((host, port), timeout)
+        # Los comandos son pequeños: enviarlos sin esperar a agrupar paquetes
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        enable_tcp_keepalive(self.sock)
+        self.buffer.clear()
+        self.events.clear()
+        self.late_responses = 0
+
+        # Bienvenida: "TS3" y una línea de texto
+        welcome = [self.read_line(timeout), self.read_line(timeout)]
+        return " ".join(line for line in welcome if line)
+
+    def close(self):
+        """Cerrar el socket"""
+        if self.sock:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+    def write(self, data):
+        """Enviar bytes al servidor"""
+        if self.recorder:
+            self.recorder.record("out", data)
+        self.sock.sendall(data)
+
+    def read_line(self, timeout):
+        """Leer una línea completa; None si pasan 'timeout' segundos sin recibir datos"""
+        deadline = time.monotonic() + max(timeout, 0)
+        while True:
+            index = self.buffer.find(LINE_END)
+            if index >= 0:
+                line = bytes(self.buffer[:index])
+                del self.buffer[:index + len(LINE_END)]
+                return line.decode('utf-8', 'replace').strip()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                return None
+            if not data:
+                raise ConnectionError("Conexión cerrada por el servidor")
+            if self.recorder:
+                self.recorder.record("in", data)
+            self.buffer += data
+            # El timeout cuenta desde el último dato recibido: una respuesta grande
+            # (clientlist de muchos clientes) no caduca mientras siga llegando
+            deadline = time.monotonic() + max(timeout, 0)
+
+    def read_response(self, timeout):
+        """Leer la respuesta a un comando; los eventos recibidos mientras tanto quedan en cola"""
+        lines = []
+        while True:
+            line = self.read_line(timeout)
+            if line is None:
+                # La respuesta puede llegar más tarde: descartarla cuando llegue
+                self.late_responses += 1
+                return None
+            if not line:
+                continue
+            if line.startswith("notify"):
+                self.events.append(line)
+                continue
+            if self.late_responses:
+                # Resto de una respuesta abandonada: no pertenece a este comando
+                if line.startswith("error id="):
+                    self.late_responses -= 1
+                continue
+            lines.append(line)
+            if line.startswith("error id="):
+                return "\n".join(lines)
+
+    def send_command(self, command, timeout):
+        """Enviar un comando y esperar su respuesta"""
+        self.write(command.encode('utf-8') + LINE_END)
+        return self.read_response(timeout)
+
+    def send_commands(self, commands, timeout):
+        """Enviar varios comandos en una sola escritura y leer sus respuestas en orden"""
+        with tracer.span("write", "query", count=len(commands)):
+            self.write(b"".join(command.encode('utf-8') + LINE_END for command in commands))
+        if not tracer.enabled:
+            return [self.read_response(timeout) for _ in commands]
+        return [traced_response(command, self.read_response, timeout) for command in commands]
+
+    def poll_events(self, timeout):
+        """Esperar eventos hasta el timeout y devolver todos los pendientes"""
+        if not self.events:
+            line = self.read_line(timeout)
+            while line is not None:
+                if line.startswith("notify"):
+                    self.events.append(line)
+                elif self.late_responses and line.startswith("error id="):
+                    # Una respuesta abandonada terminó de llegar mientras no había comandos
+                    self.late_responses -= 1
+                # Sin bloquear: solo las líneas que ya están en el buffer
+                line = self.read_line(0)
+
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+
+class TS3LibQueryBackend:
+    """Backend ServerQuery sobre el paquete ts3 (opcional)"""
+
+    name = "ts3"
+
+    def __init__(self):
+        if ts3 is None:
+            raise ImportError("El backend 'ts3' requiere el paquete ts3 (pip install ts3)")
+        self.conn = None
+
+    def open(self, host, port, timeout=10):
+        """Abrir la conexión (ts3 consume la bienvenida internamente)"""
+        self.conn = ts3.query.TS3Connection()
+        self.conn.open(host, port, timeout)
+        enable_tcp_keepalive(self.conn.telnet_conn.get_socket())
+        return ""
+
+    def close(self):
+        """Cerrar la conexión"""
+        if self.conn:
+            try:
+                self.conn.close()
+            finally:
+                self.conn = None
+
+    def send_command(self, command, timeout):
+        """Enviar un comando ya escapado y esperar su respuesta"""
+        self.write(command)
+        return self.read_response(timeout)
+
+    def send_commands(self, commands, timeout):
+        """La librería ts3 no admite varios comandos en vuelo: se envían en secuencia"""
+        responses = []
+        for command in commands:
+            with tracer.span("write", "query", count=1):
+                self.write(command)
+            if tracer.enabled:
+                responses.append(traced_response(command, self.read_response, timeout))
+            else:
+                responses.append(self.read_response(timeout))
+        return responses
+
+    def write(self, command):
+        """Escribir un comando tal cual"""
+        # TS3Connection.send() vuelve a escapar los parámetros, así que el comando
+        # se escribe tal cual y se usa la espera de respuesta de la librería
+        self._telnet().write(command.encode('utf-8') + LINE_END)
+        self.conn._num_pending_queries += 1
+
+    def read_response(self, timeout):
+        """Esperar la respuesta al comando escrito; None si vence el timeout"""
+        try:
+            response = self.conn._wait_for_resp(timeout=timeout)
+        except ts3.query.TS3QueryError as e:
+            response = e.resp
+        except ts3.query.TS3TimeoutError:
+            # La respuesta tardía se descarta en la siguiente espera
+            return None
+        except (ts3.query.TS3RecvError, EOFError) as e:
+            raise ConnectionError(str(e) or "Conexión cerrada por el servidor")
+        return self._decode(response)
+
+    def poll_events(self, timeout):
+        """Esperar eventos hasta el timeout y devolver todos los pendientes"""
+        events = []
+        self._telnet()
+        try:
+            event = self.conn.wait_for_event(timeout=timeout)
+        except ts3.query.TS3TimeoutError:
+            return events
+        except (ts3.query.TS3RecvError, EOFError) as e:
+            # telnetlib lanza EOFError cuando el servidor cierra el socket
+            raise ConnectionError(str(e) or "Conexión cerrada por el servidor")
+
+        while event is not None:
+            events.append(self._decode(event))
+            event = self.conn._event_queue.pop(0) if self.conn._event_queue else None
+        return events
+
+    def _telnet(self):
+        """Conexión telnet de ts3; la librería la pone a None al cerrarse tras un error"""
+        telnet = self.conn.telnet_conn if self.conn else None
+        if telnet is None:
+            raise ConnectionError("Conexión cerrada")
+        return telnet
+
+    @staticmethod
+    def _decode(response):
+        """Convertir una respuesta de ts3 al mismo formato de texto que el backend socket"""
+        return response.data_bytestr.decode('utf-8', 'replace').replace("\n\r", "\n").strip()
+
+
+BACKENDS = {
+    SocketQueryBackend.name: SocketQueryBackend,
+    TS3LibQueryBackend.name: TS3LibQueryBackend
+}
+
+
+def create_backend(name):
+    """Crear un backend por nombre"""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend ServerQuery desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+class QueryConnection:
+    """Conexión ServerQuery con autenticación, reconexión, caché e instrumentación"""
+
+    def __init__(self, backend=QUERY_BACKEND, host=TS3_HOST, port=TS3_QUERY_PORT,
+                 username=TS3_USERNAME, password=TS3_PASSWORD, recorder=None, virtual_server_id=TS3_SERVER_ID):
+        self.backend_name = backend
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        # Servidor virtual a seleccionar tras autenticar (None = usuario server bound)
+        self.virtual_server_id = virtual_server_id
+        # Llamado tras autenticar (p. ej. para medir el arranque)
+        self.on_authenticated = None
+
+        self.backend = None
+        self.connected = False
+        self.reconnect_attempts = 0
+        self.server_id = None
+        self.client_id = None
+        self.listening_events = False
+
+        # Keepalive adaptativo: solo se sondea tras un periodo sin tráfico, de modo
+        # que una conexión muerta se detecta en KEEPALIVE_DETECTION_TIME como mucho
+        self.keepalive_idle = max(1, KEEPALIVE_DETECTION_TIME - COMMAND_TIMEOUT)
+        self.keepalive_pending = False
+        self.last_traffic = time.monotonic()
+
+        # Grabador del flujo ServerQuery (solo backend socket)
+        self.recorder = recorder
+
+        # Caché de respuestas: comando -> (expira, respuesta)
+        self.cache = {}
+        self.cache_ttl = QUERY_CACHE_TTL
+        self.stats = QueryStats()
+
+        self.logger = logging.getLogger(__name__)
+
+    def connect(self, pipeline=False):
+        """Conectar, autenticar, identificar al bot y registrar eventos"""
+        try:
+            self.logger.info(f"Conectando a {self.host}:{self.port} (backend: {self.backend_name})...")
+
+            self.backend = create_backend(self.backend_name)
+            if self.recorder:
+                if hasattr(self.backend, "recorder"):
+                    self.backend.recorder = self.recorder
+                else:
+                    self.logger.warning(f"⚠️ El backend '{self.backend_name}' no admite grabación del flujo")
+            welcome = self.backend.open(self.host, self.port)
+            if welcome:
+                self.logger.info(f"Mensaje de bienvenida: {welcome}")
+
+            # Autenticar
+            self.logger.info(f"Autenticando con usuario: {self.username}")
+            auth_response = self.send_command(f"login {escape(self.username)} {escape(self.password)}")
+
+            if is_ok(auth_response):
+                self.logger.info("✅ Autenticación exitosa")
+                if self.on_authenticated:
+                    self.on_authenticated()
+            else:
+                self.logger.error(f"❌ Error de autenticación: {auth_response}")
+                self.close()
+                return False
+
+            if self.virtual_server_id is not None:
+                use_response = self.send_command(f"use sid={self.virtual_server_id}")
+                if not is_ok(use_response):
+                    self.logger.error(f"❌ No se pudo seleccionar el servidor virtual {self.virtual_server_id}: {use_response}")
+                    self.close()
+                    return False
+                self.logger.info(f"Servidor virtual {self.virtual_server_id} seleccionado")
+
+            register_commands = [f"servernotifyregister event={event}" for event in NOTIFY_EVENTS]
+            if pipeline:
+                # whoami y registro de eventos en una sola ida y vuelta
+                responses = self.send_commands(["whoami"] + register_commands)
+                whoami_response = responses[0]
+            else:
+                # Verificar en qué servidor estamos (para usuarios server bound no necesitamos cambiar)
+                whoami_response = self.send_command("whoami")
+                responses = [whoami_response] + [self.send_command(command) for command in register_commands]
+
+            if is_ok(whoami_response):
+                self.logger.info("✅ Usuario server bound - usando servidor asignado")
+                whoami = parse_properties(whoami_response.split("\n", 1)[0])
+                self.server_id = whoami.get("virtualserver_id", self.server_id)
+                self.client_id = whoami.get("client_id", self.client_id)
+                self.logger.info(f"📍 Usando servidor virtual ID: {self.server_id}")
+                self.logger.info(f"🤖 ID del bot: {self.client_id}")
+            else:
+                self.logger.warning("⚠️ No se pudo verificar información del usuario, continuando...")
+
+            self.listening_events = all(is_ok(response) for response in responses[1:])
+            if self.listening_events:
+                self.logger.info("✅ Eventos registrados - escuchando comandos")
+            else:
+                self.logger.warning("⚠️ No se pudieron registrar todos los eventos")
+
+            self.connected = True
+            self.reconnect_attempts = 0
+            self.keepalive_pending = False
+            self.last_traffic = time.monotonic()
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error de conexión: {e}")
+            self.close()
+            return False
+
+    def send_command(self, command, timeout=COMMAND_TIMEOUT):
+        """Enviar un comando y devolver la respuesta en texto (None si falla)"""
+        if not self.backend:
+            return None
+
+        start = time.perf_counter()
+        with tracer.command_span(command) as span:
+            try:
+                response = self.backend.send_command(command, timeout)
+            except (OSError, ConnectionError) as e:
+                self.connection_lost(f"error enviando comando: {e}")
+                response = None
+            if tracer.enabled:
+                # Sin respuesta = timeout o conexión caída
+                span.set(ok=is_ok(response), timeout=response is None)
+        self.stats.record(command, time.perf_counter() - start, is_ok(response))
+        if response is not None:
+            self.last_traffic = time.monotonic()
+        return response
+
+    def send_commands(self, commands, timeout=COMMAND_TIMEOUT):
+        """Enviar varios comandos juntos (una ida y vuelta si el backend lo permite)"""
+        if not self.backend:
+            return [None] * len(commands)
+
+        start = time.perf_counter()
+        # Span de la tanda; el backend añade dentro uno de escritura y uno por respuesta
+        with tracer.span("pipeline", "query", count=len(commands)) as span:
+            try:
+                responses = self.backend.send_commands(commands, timeout)
+            except (OSError, ConnectionError) as e:
+                self.connection_lost(f"error enviando comandos: {e}")
+                responses = [None] * len(commands)
+            if tracer.enabled:
+                span.set(timeouts=sum(response is None for response in responses))
+
+        # El tiempo de la tanda se reparte entre sus comandos
+        elapsed = (time.perf_counter() - start) / max(len(commands), 1)
+        for command, response in zip(commands, responses):
+            self.stats.record(command, elapsed, is_ok(response))
+        if any(response is not None for response in responses):
+            self.last_traffic = time.monotonic()
+        return responses
+
+    def cached_command(self, command, ttl=None):
+        """Enviar un comando de consulta reutilizando la respuesta si es reciente"""
+        if ttl is None:
+            ttl = self.cache_ttl
+        now = time.monotonic()
+        entry = self.cache.get(command)
+        if entry and entry[0] > now:
+            self.stats.cache_hits += 1
+            return entry[1]
+
+        response = self.send_command(command)
+        if is_ok(response):
+            self.cache[command] = (now + ttl, response)
+        return response
+
+    def invalidate_cache(self, prefix=None):
+        """Descartar respuestas en caché (todas o las que empiezan por el prefijo)"""
+        if prefix is None:
+            self.cache.clear()
+            return
+        for command in [command for command in self.cache if command.startswith(prefix)]:
+            del self.cache[command]
+
+    def poll_events(self, timeout):
+        """Devolver los eventos recibidos, esperando como mucho el timeout"""
+        if not self.backend:
+            return []
+        with tracer.span("receive", "query") as span:
+            try:
+                events = self.backend.poll_events(timeout)
+            except (OSError, ConnectionError) as e:
+                self.connection_lost(f"error leyendo eventos: {e}")
+                return []
+            span.set(events=len(events))
+        if events:
+            self.stats.events += len(events)
+            self.last_traffic = time.monotonic()
+        return events
+
+    def connection_lost(self, reason):
+        """Marcar la conexión como caída y registrar cuánto tardó en detectarse"""
+        if not self.connected:
+            return
+        self.connected = False
+        detection = time.monotonic() - self.last_traffic
+        self.stats.record_disconnect(detection)
+        self.logger.error(f"💔 Conexión perdida ({reason}) - detectada {detection:.1f} s después del último tráfico")
+
+    def keepalive_due(self):
+        """Indicar si toca sondear la conexión (sin tráfico durante keepalive_idle segundos)"""
+        return (self.connected and not self.keepalive_pending and
+                time.monotonic() - self.last_traffic >= self.keepalive_idle)
+
+    def keepalive_sent(self):
+        """Anotar un keepalive en vuelo: no se sondea otra vez hasta su respuesta"""
+        self.keepalive_pending = True
+        self.stats.keepalives += 1
+
+    def on_keepalive(self, response):
+        """Respuesta del keepalive: sin respuesta en COMMAND_TIMEOUT la conexión se da por muerta"""
+        self.keepalive_pending = False
+        if response is None:
+            self.connection_lost("keepalive sin respuesta")
+
+    def close(self):
+        """Cerrar el backend sin enviar logout"""
+        if self.backend:
+            try:
+                self.backend.close()
+            except Exception as e:
+                self.logger.error(f"Error al cerrar la conexión: {e}")
+        self.backend = None
+        self.connected = False
+        self.listening_events = False
+        self.invalidate_cache()
+
+    def disconnect(self):
+        """Desconectar del servidor"""
+        if self.backend:
+            try:
+                self.send_command("logout")
+                self.logger.info("🔌 Desconectado del servidor")
+            except Exception as e:
+                self.logger.error(f"Error al desconectar: {e}")
+            finally:
+                self.close()
+
+    def reconnect(self, pipeline=False):
+        """Intentar reconectar al servidor hasta agotar los intentos"""
+        # Limpiar conexión anterior
+        self.disconnect()
+
+        while self.reconnect_attempts < MAX_RECONNECT_ATTEMPTS:
+            self.reconnect_attempts += 1
+            self.logger.info(f"🔄 Intento de reconexión {self.reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}")
+
+            # Esperar antes de reconectar
+            time.sleep(RECONNECT_DELAY)
+
+            if self.connect(pipeline=pipeline):
+                return True
+
+        self.logger.error(f"❌ Máximo de intentos de reconexión alcanzado ({MAX_RECONNECT_ATTEMPTS})")
+        return False
@@ -0,0 +1,268 @@
+"""
+Carga de la configuración: valores de config.py, archivo TOML y variables de entorno
+
+Orden de prioridad (de menor a mayor):
+  1. Valores por defecto de config.py
+  2. Archivo TOML (CONFIG_PATH, o la ruta de la variable TS3_CONFIG; la ruta no
+     se puede cambiar desde el propio archivo ni con TS3_CONFIG_PATH)
+  3. Variables de entorno: TS3_<NOMBRE> (o el propio nombre si ya empieza por TS3_),
+     p. ej. TS3_PASSWORD, TS3_OUTBOUND_WINDOW, TS3_COMMAND_PERMISSIONS='{"!mp": "25770"}'
+
+En el archivo, las claves son los nombres de config.py en minúsculas; una tabla
+agrupa por prefijo ([outbound] window = 4 equivale a outbound_window = 4). Ver
+bot.example.toml.
+
+La tabla de permisos (command_permissions) se combina comando a comando con
+la de config.py: un comando que no aparece conserva su grupo por defecto, y un
+comando desconocido (p. ej. "!MP") invalida la configuración.
+
+Cada valor se valida contra el tipo del valor por defecto (un entero vale donde
+se espera float) y, si es numérico, contra su rango (LIMITS, POSITIVE); con un
+solo valor inválido se descarta la configuración entera. Los ajustes de
+RELOADABLE se vuelven a aplicar en caliente cuando cambia el archivo
+(ConfigWatcher); el resto requieren reiniciar el bot.
+"""
+
+import json
+import logging
+import os
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Ajustes que se pueden cambiar sin reiniciar ni reconectar
+RELOADABLE = frozenset((
+    "COMMAND_PERMISSIONS",
+    "OUTBOUND_WINDOW", "OUTBOUND_DRAIN_BUDGET", "OUTBOUND_STARVATION_LIMIT",
+    "QUERY_CACHE_TTL",
+    "AFK_SWEEP_INTERVAL", "AFK_CHANNEL_ID", "AFK_MOVE_AFTER", "AFK_AWAY_MOVE_AFTER",
+    "AFK_KICK_AFTER", "AFK_KICK_MESSAGE"
+))
+
+# Ajustes que no se pueden sobrescribir: la ruta del archivo se decide antes de leerlo (TS3_CONFIG)
+FIXED = frozenset(("CONFIG_PATH",))
+
+TRUE_VALUES = ("1", "true", "yes", "on", "si", "sí")
+FALSE_VALUES = ("0", "false", "no", "off", "")
+
+logger = logging.getLogger(__name__)
+
+
+def merge_permissions(name, value, default):
+    """Combinar la tabla de permisos comando a comando sobre la de config.py"""
+    unknown = [command for command in value if command not in default]
+    if unknown:
+        raise ValueError(f"{name}: comandos desconocidos: {', '.join(unknown)} (opciones: {', '.join(default)})")
+    for command, groups in value.items():
+        items = groups if isinstance(groups, list) else [groups]
+        if not all(group is None or isinstance(group, str) or
+                   (isinstance(group, int) and not isinstance(group, bool)) for group in items):
+            raise ValueError(f"{name}: grupo inválido para {command}: {groups!r}")
+    return dict(default, **value)
+
+
+# Límites de los ajustes numéricos: (mínimo, máximo), None = sin límite
+LIMITS = {
+    "TS3_PORT": (1, 65535), "TS3_QUERY_PORT": (1, 65535), "CONTROL_API_PORT": (1, 65535),
+    "OUTBOUND_WINDOW": (1, None), "OUTBOUND_DRAIN_BUDGET": (1, None), "OUTBOUND_STARVATION_LIMIT": (1, None),
+    "MAX_RECONNECT_ATTEMPTS": (1, None), "AUDIT_QUEUE_SIZE": (1, None), "AUDIT_BATCH_SIZE": (1, None),
+    "TRACE_MAX_EVENTS": (1, None), "CONTROL_API_MAX_JOBS": (1, None),
+    "QUERY_CACHE_TTL": (0, None), "RECONNECT_DELAY": (0, None), "PROFILE_EVERY": (0, None),
+    "CONFIG_RELOAD_INTERVAL": (0, None), "AFK_MOVE_AFTER": (0, None), "AFK_AWAY_MOVE_AFTER": (0, None),
+    "AFK_KICK_AFTER": (0, None)
+}
+
+# Intervalos y esperas que deben ser estrictamente mayores que cero
+POSITIVE = frozenset((
+    "COMMAND_TIMEOUT", "KEEPALIVE_DETECTION_TIME", "AFK_SWEEP_INTERVAL", "SCHEDULER_TICK",
+    "AUDIT_FLUSH_INTERVAL"
+))
+
+
+def check_limits(name, value, default):
+    """Comprobar que un ajuste numérico está dentro de su rango"""
+    if name in POSITIVE and value <= 0:
+        raise ValueError(f"{name}: debe ser mayor que 0 (se recibió {value})")
+    minimum, maximum = LIMITS.get(name, (None, None))
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name}: debe ser al menos {minimum} (se recibió {value})")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{name}: debe ser como mucho {maximum} (se recibió {value})")
+    return value
+
+
+# Validación adicional por ajuste (recibe nombre, valor ya tipado y valor por defecto)
+VALIDATORS = dict.fromkeys(LIMITS.keys() | POSITIVE, check_limits)
+VALIDATORS["COMMAND_PERMISSIONS"] = merge_permissions
+
+# Valores por defecto de config.py, ruta del archivo y valores efectivos (tras apply_overrides)
+DEFAULTS = {}
+config_path = None
+effective = {}
+
+
+def env_name(name):
+    """Variable de entorno que sobrescribe un ajuste"""
+    return name if name.startswith("TS3_") else f"TS3_{name}"
+
+
+def convert(name, value, default):
+    """Validar (y convertir si viene como texto de entorno) un valor según el tipo por defecto"""
+    expected = type(default)
+    if isinstance(value, str) and default is not None and expected is not str:
+        text = value.strip()
+        try:
+            if expected is bool:
+                if text.lower() in TRUE_VALUES:
+                    return True
+                if text.lower() in FALSE_VALUES:
+                    return False
+                raise ValueError(text)
+            if expected in (int, float):
+                return expected(text)
+            value = json.loads(text)
+        except ValueError:
+            raise ValueError(f"{name}: valor inválido {value!r} (se esperaba {expected.__name__})")
+
+    if default is None or isinstance(value, expected):
+        # bool es subclase de int: no aceptar True donde se espera un número
+        if isinstance(value, bool) and expected in (int, float):
+            raise ValueError(f"{name}: se esperaba {expected.__name__}, no bool")
+        return value
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    raise ValueError(f"{name}: se esperaba {expected.__name__}, se recibió {type(value).__name__}")
+
+
+def load_file(path, defaults):
+    """Leer el archivo TOML y devolver {NOMBRE: valor}; {} si no existe"""
+    if not path or not os.path.exists(path):
+        return {}
+    if tomllib is None:
+        raise ValueError(f"No se puede leer {path}: se requiere Python 3.11+ o el paquete tomli")
+    with open(path, "rb") as config_file:
+        try:
+            data = tomllib.load(config_file)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+
+    values = {}
+    unknown = []
+    for key, value in data.items():
+        name = key.upper()
+        if name in defaults:
+            values[name] = value
+        elif isinstance(value, dict):
+            # Tabla de agrupación: [outbound] window = 4 -> OUTBOUND_WINDOW
+            for sub_key, sub_value in value.items():
+                sub_name = f"{name}_{sub_key.upper()}"
+                if sub_name in defaults:
+                    values[sub_name] = sub_value
+                else:
+                    unknown.append(f"{key}.{sub_key}")
+        else:
+            unknown.append(key)
+    if unknown:
+        raise ValueError(f"{path}: ajustes desconocidos: {', '.join(unknown)}")
+    return values
+
+
+def load_overrides(defaults, path):
+    """Combinar archivo y entorno, validando cada valor; lanza ValueError con todos los errores"""
+    defaults = {name: value for name, value in defaults.items() if name not in FIXED}
+    raw = load_file(path, defaults)
+    for name in defaults:
+        value = os.environ.get(env_name(name))
+        if value is not None:
+            raw[name] = value
+
+    overrides = {}
+    errors = []
+    for name, value in raw.items():
+        try:
+            value = convert(name, value, defaults[name])
+            if name in VALIDATORS:
+                value = VALIDATORS[name](name, value, defaults[name])
+            overrides[name] = value
+        except ValueError as e:
+            errors.append(str(e))
+    if errors:
+        raise ValueError("Configuración inválida: " + "; ".join(errors))
+    return overrides
+
+
+def apply_overrides(namespace):
+    """Aplicar archivo y entorno sobre los valores de config.py (al importarlo)"""
+    global config_path
+    DEFAULTS.update({
+        name: value for name, value in namespace.items()
+        if name.isupper() and not name.startswith("_")
+    })
+    config_path = os.environ.get("TS3_CONFIG", DEFAULTS.get("CONFIG_PATH"))
+    namespace.update(load_overrides(DEFAULTS, config_path))
+    effective.update({name: namespace[name] for name in DEFAULTS})
+
+
+def file_signature(path):
+    """Firma barata del archivo (mtime y tamaño) para detectar cambios"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ConfigWatcher:
+    """Vigila el archivo de configuración (mtime) y aplica los ajustes recargables"""
+
+    def __init__(self, bot, interval, path=None):
+        self.bot = bot
+        self.interval = interval
+        self.path = path or config_path
+        self.signature = file_signature(self.path)
+        self.reloads = 0
+        self.timer = None
+        if self.path and interval:
+            self.timer = self.bot.scheduler.wheel.schedule(self.interval, self._tick)
+
+    def stop(self):
+        """Dejar de vigilar el archivo"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def _tick(self):
+        """Temporizador: un stat() por intervalo, recarga solo si cambió el archivo"""
+        self.timer = self.bot.scheduler.wheel.schedule(self.interval, self._tick)
+        signature = file_signature(self.path)
+        if signature != self.signature:
+            self.signature = signature
+            self.reload()
+
+    def reload(self):
+        """Releer archivo y entorno; aplicar los cambios recargables todos juntos o ninguno"""
+        try:
+            values = dict(DEFAULTS)
+            values.update(load_overrides(DEFAULTS, self.path))
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ {e} - se mantiene la configuración actual")
+            return False
+
+        changed = {name: value for name, value in values.items() if value != effective.get(name)}
+        restart = sorted(name for name in changed if name not in RELOADABLE)
+        if restart:
+            logger.warning(f"⚠️ Ajustes que requieren reiniciar el bot: {', '.join(restart)}")
+
+        live = {name: value for name, value in changed.items() if name in RELOADABLE}
+        if not live:
+            return False
+        self.bot.apply_settings(live)
+        effective.update(live)
+        self.reloads += 1
+        logger.info(f"🔧 Configuración recargada: {', '.join(sorted(live))}")
+        return True
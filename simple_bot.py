@@ -2,28 +2,37 @@
 Bot simple de TeamSpeak 3 usando socket directo para ServerQuery
 """
 
-import socket
 import time
 import logging
 import sys
-import threading
-import re
-from config import (
-    TS3_HOST, TS3_PORT, TS3_QUERY_PORT, 
-    TS3_USERNAME, TS3_PASSWORD,
-    RECONNECT_DELAY, MAX_RECONNECT_ATTEMPTS
-)
+from config import FAST_START, QUERY_BACKEND, TS3_SERVER_ID, COMMAND_PERMISSIONS, CONFIG_RELOAD_INTERVAL
+from serverquery import QueryConnection, KEEPALIVE_COMMAND, parse_list, parse_properties, is_ok, unescape
+from command_queue import OutboundScheduler, CommandBatch, PRIORITY_CONTROL, PRIORITY_INTERACTIVE
+from audit import create_audit_log
+from tracing import tracer
+from scheduler import JobScheduler
+from afk import AFKEngine
+from control_api import NullControlAPI
+from settings import ConfigWatcher, effective as effective_settings
 
 class SimpleTeamSpeakBot:
-    def __init__(self):
-        self.socket = None
-        self.connected = False
-        self.reconnect_attempts = 0
-        self.server_id = None
-        self.bot_client_id = None
-        self.listening_events = False
-        
-        # Configurar logging
+    # Backend ServerQuery por defecto (ver serverquery.BACKENDS)
+    backend_name = QUERY_BACKEND
+    # Servidor virtual a seleccionar (None = el asignado al usuario query)
+    virtual_server_id = TS3_SERVER_ID
+    # Mostrar también IP, puerto y tiempo activo en la información del servidor
+    server_info_details = False
+    
+    # Ayuda de cada comando: (argumentos, descripción, ejemplo); los grupos salen de self.permissions
+    command_help = {
+        '!mp': ("[mensaje]", "Enviar poke a todos los usuarios", "!mp Hola a todos"),
+        '!mm': ("", "Mover todos al canal del comando", None),
+        '!mk': ("[mensaje]", "Expulsar a todos del servidor", "!mk Limpieza del servidor"),
+        '!test': ("", "Ver lista de usuarios (debug)", None)
+    }
+    
+    def __init__(self, fast_start=FAST_START, process_start=None, backend=None, recorder=None, audit=None, control=None):
+        # Configurar logging antes de crear los componentes que ya registran mensajes al iniciarse
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
@@ -33,6 +42,37 @@ class SimpleTeamSpeakBot:
         )
         self.logger = logging.getLogger(__name__)
         
+        # Conexión compartida: autenticación, reconexión, caché e instrumentación
+        self.query = QueryConnection(backend or self.backend_name, recorder=recorder,
+                                     virtual_server_id=self.virtual_server_id)
+        
+        # Cola de salida con prioridades: control > respuestas interactivas > acciones masivas
+        self.outbound = OutboundScheduler(self.query)
+        
+        # Tareas programadas (config.SCHEDULED_JOBS), avanzadas desde el bucle principal
+        self.scheduler = JobScheduler(self)
+        
+        # Detección de inactividad: un clientlist por barrido sobre la misma rueda
+        self.afk = AFKEngine(self)
+        
+        # Auditoría de comandos (se escribe en segundo plano, nunca bloquea el bucle)
+        self.audit = audit if audit is not None else create_audit_log()
+        
+        # API HTTP de control: sus peticiones se atienden desde el bucle principal
+        self.control = control if control is not None else NullControlAPI()
+        
+        # Arranque rápido: la información del servidor se muestra de forma diferida
+        self.fast_start = fast_start
+        self.server_info_pending = False
+        self.server_info_shown = False
+        
+        # Métricas de arranque (segundos desde el inicio del proceso)
+        self.process_start = process_start if process_start is not None else time.perf_counter()
+        self.startup_metrics = {}
+        # Secuencia de la cola a partir de la cual una respuesta cuenta como "primer comando atendido"
+        self.first_reply_sequence = None
+        self.query.on_authenticated = lambda: self.mark_startup("autenticado")
+        
         # Comandos disponibles
         self.commands = {
             '!mp': self.command_mass_poke,
@@ -40,126 +80,94 @@ class SimpleTeamSpeakBot:
             '!mk': self.command_mass_kick,
             '!test': self.command_test_clients
         }
+        
+        # Permisos por comando (se reemplazan de una vez al recargar la configuración)
+        self.permissions = self.normalize_permissions(COMMAND_PERMISSIONS)
+        missing = [command for command in self.commands if command not in self.permissions]
+        if missing:
+            self.logger.warning(f"⚠️ Comandos sin entrada en COMMAND_PERMISSIONS (quedan denegados): {', '.join(missing)}")
+        
+        # Recarga en caliente del archivo de configuración (permisos, colas, AFK)
+        self.config_watcher = ConfigWatcher(self, CONFIG_RELOAD_INTERVAL)
+    
+    @property
+    def connected(self):
+        return self.query.connected
+    
+    @property
+    def server_id(self):
+        return self.query.server_id
+    
+    @property
+    def bot_client_id(self):
+        return self.query.client_id
+    
+    @property
+    def listening_events(self):
+        return self.query.listening_events
     
     def send_command(self, command):
         """Enviar comando al servidor TeamSpeak"""
-        try:
-            if not self.socket:
-                return None
-            
-            full_command = command + "\n\r"
-            self.socket.send(full_command.encode('utf-8'))
-            
-            # Leer respuesta
-            response = ""
-            while True:
-                self.socket.settimeout(2)  # Timeout corto para no bloquear
-                try:
-                    data = self.socket.recv(1024).decode('utf-8')
-                    response += data
-                    if "error id=" in response:
-                        break
-                except socket.timeout:
-                    # Si hay timeout, puede que sea un evento
-                    if response and "notify" in response:
-                        # Es un evento, procesarlo
-                        self.handle_event(response)
-                        response = ""
-                        continue
-                    break
-            
-            return response.strip()
-            
-        except Exception as e:
-            self.logger.error(f"Error enviando comando: {e}")
-            return None
+        return self.query.send_command(command)
     
-
+    def mark_startup(self, stage):
+        """Registrar el tiempo transcurrido desde el inicio del proceso hasta una etapa del arranque"""
+        if stage in self.startup_metrics:
+            return
+        elapsed = time.perf_counter() - self.process_start
+        self.startup_metrics[stage] = elapsed
+        self.logger.info(f"⏱️ Arranque - {stage}: {elapsed * 1000:.1f} ms")
+    
+    def on_outbound_sent(self, entry):
+        """Marcar el primer comando atendido cuando su primera respuesta sale de la cola"""
+        if self.first_reply_sequence is not None and entry.sequence >= self.first_reply_sequence:
+            self.mark_startup("primer comando atendido")
+            self.outbound.on_sent = None
     
     def connect(self):
         """Conectar al servidor TeamSpeak 3"""
-        try:
-            self.logger.info(f"Conectando a {TS3_HOST}:{TS3_QUERY_PORT}...")
-            
-            # Crear socket
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
-            
-            # Conectar
-            self.socket.connect((TS3_HOST, TS3_QUERY_PORT))
-            
-            # Leer mensaje de bienvenida
-            welcome = self.socket.recv(1024).decode('utf-8')
-            self.logger.info(f"Mensaje de bienvenida: {welcome.strip()}")
-            
-            # Autenticar
-            self.logger.info(f"Autenticando con usuario: {TS3_USERNAME}")
-            auth_response = self.send_command(f"login {TS3_USERNAME} {TS3_PASSWORD}")
-            
-            if auth_response and "error id=0" in auth_response:
-                self.logger.info("✅ Autenticación exitosa")
-            else:
-                self.logger.error(f"❌ Error de autenticación: {auth_response}")
-                return False
-            
-            # Verificar en qué servidor estamos (para usuarios server bound no necesitamos cambiar)
-            whoami_response = self.send_command("whoami")
-            if whoami_response and "error id=0" in whoami_response:
-                self.logger.info("✅ Usuario server bound - usando servidor asignado")
-                # Extraer información del servidor actual
-                if "virtualserver_id=" in whoami_response:
-                    for part in whoami_response.split():
-                        if part.startswith("virtualserver_id="):
-                            self.server_id = part.split("=")[1]
-                            self.logger.info(f"📍 Usando servidor virtual ID: {self.server_id}")
-                        elif part.startswith("client_id="):
-                            self.bot_client_id = part.split("=")[1]
-                            self.logger.info(f"🤖 ID del bot: {self.bot_client_id}")
-            else:
-                self.logger.warning("⚠️ No se pudo verificar información del usuario, continuando...")
-            
-            # Registrar eventos para escuchar comandos
-            self.register_events()
-            
-            self.connected = True
-            self.reconnect_attempts = 0
-            
+        # En arranque rápido whoami y el registro de eventos van en una sola ida y vuelta
+        if not self.query.connect(pipeline=self.fast_start):
+            return False
+        
+        self.on_connected()
+        return True
+    
+    def on_connected(self):
+        """Pasos posteriores a cada conexión o reconexión"""
+        # Los eventos se procesarán en el bucle principal
+        self.logger.info("🎧 Sistema de comandos activado")
+        self.mark_startup("comandos activos")
+        
+        if self.fast_start:
+            # Mostrar información del servidor cuando el bucle principal esté libre (solo una vez)
+            self.server_info_pending = not self.server_info_shown
+        else:
             # Mostrar información del servidor
             self.show_server_info()
-            
-            # Los eventos se procesarán en el bucle principal
-            self.logger.info("🎧 Sistema de comandos activado")
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error de conexión: {e}")
-            self.connected = False
-            return False
     
     def show_server_info(self):
         """Mostrar información básica del servidor"""
+        self.server_info_pending = False
+        self.server_info_shown = True
         try:
             # Obtener información del servidor
             server_info = self.send_command("serverinfo")
             
-            if server_info and "error id=0" in server_info:
+            if is_ok(server_info):
                 print("\n" + "="*50)
                 print("📊 INFORMACIÓN DEL SERVIDOR")
                 print("="*50)
                 
                 # Parsear información básica
-                lines = server_info.split('\n')
-                for line in lines:
-                    if line.startswith('virtualserver_name='):
-                        name = line.split('=', 1)[1]
-                        print(f"🏷️  Nombre: {name}")
-                    elif line.startswith('virtualserver_clientsonline='):
-                        clients = line.split('=', 1)[1]
-                        print(f"👥 Clientes conectados: {clients}")
-                    elif line.startswith('virtualserver_maxclients='):
-                        max_clients = line.split('=', 1)[1]
-                        print(f"📊 Máximo de clientes: {max_clients}")
+                server_data = parse_properties(server_info.split('\n', 1)[0])
+                print(f"🏷️  Nombre: {unescape(server_data.get('virtualserver_name', 'N/A'))}")
+                print(f"👥 Clientes conectados: {server_data.get('virtualserver_clientsonline', 'N/A')}")
+                print(f"📊 Máximo de clientes: {server_data.get('virtualserver_maxclients', 'N/A')}")
+                if self.server_info_details:
+                    print(f"🌐 IP: {server_data.get('virtualserver_ip', 'N/A')}")
+                    print(f"🔌 Puerto: {server_data.get('virtualserver_port', 'N/A')}")
+                    print(f"⏰ Tiempo activo: {server_data.get('virtualserver_uptime', 'N/A')} segundos")
                 
                 print("="*50)
                 
@@ -167,86 +175,64 @@ class SimpleTeamSpeakBot:
                 self.show_connected_clients()
                 
                 # Mostrar comandos disponibles
-                print("\n🎮 COMANDOS DISPONIBLES:")
-                print("-" * 50)
-                print("  !mp [mensaje] - Enviar poke a todos los usuarios")
-                print("                  Ejemplo: !mp Hola a todos")
-                print("                  🔒 Requiere grupo de servidor: 25770")
-                print("  !mm - Mover todos al canal del comando")
-                print("        🔒 Requiere grupo de servidor: 25771")
-                print("  !mk [mensaje] - Expulsar a todos del servidor")
-                print("                  Ejemplo: !mk Limpieza del servidor")
-                print("                  🔒 Requiere grupo de servidor: 25787")
-                print("  !test - Ver lista de usuarios (debug)")
-                print("         📂 Sin restricciones")
-                print("-" * 50)
+                self.show_command_help()
                 
         except Exception as e:
             self.logger.error(f"Error al obtener información del servidor: {e}")
     
+    def show_command_help(self):
+        """Mostrar los comandos disponibles con los grupos requeridos según la configuración"""
+        print("\n🎮 COMANDOS DISPONIBLES:")
+        print("-" * 50)
+        for command in self.commands:
+            arguments, description, example = self.command_help.get(command, ("", "", None))
+            header = f"  {command} {arguments}".rstrip() + " - "
+            indent = " " * len(header)
+            print(f"{header}{description}")
+            if example:
+                print(f"{indent}Ejemplo: {example}")
+            groups = self.permissions.get(command)
+            if groups is None:
+                print(f"{indent}⛔ Sin entrada en COMMAND_PERMISSIONS (denegado)")
+            elif groups:
+                print(f"{indent}🔒 Requiere grupo de servidor: {', '.join(groups)}")
+            else:
+                print(f"{indent}📂 Sin restricciones")
+        print("-" * 50)
+    
     def show_connected_clients(self):
         """Mostrar lista de clientes conectados"""
         try:
-            clients_info = self.send_command("clientlist")
+            clients_info = self.query.cached_command("clientlist")
             
-            if clients_info and "error id=0" in clients_info:
+            if is_ok(clients_info):
                 print("\n👥 CLIENTES CONECTADOS:")
                 print("-" * 30)
                 
-                # Parsear lista de clientes usando el mismo método que get_all_clients
-                if "clid=" in clients_info:
-                    client_blocks = clients_info.split("clid=")[1:]
+                for client_data in parse_list(clients_info):
+                    client_name = client_data.get('client_nickname', 'Desconocido')
+                    client_id = client_data.get('clid', 'N/A')
+                    client_type = client_data.get('client_type', '0')
                     
-                    for block in client_blocks:
-                        client_data = {}
-                        parts = block.split()
-                        if parts:
-                            client_data['clid'] = parts[0]
-                            
-                            for part in parts:
-                                if '=' in part:
-                                    key, value = part.split('=', 1)
-                                    client_data[key] = value
-                        
-                        client_name = client_data.get('client_nickname', 'Desconocido')
-                        client_id = client_data.get('clid', 'N/A')
-                        client_type = client_data.get('client_type', '0')
-                        
-                        # Mostrar todos los usuarios reales (client_type = 0)
-                        if client_type == '0':
-                            print(f"  👤 {client_name} (ID: {client_id})")
+                    # Mostrar todos los usuarios reales (client_type = 0)
+                    if client_type == '0':
+                        print(f"  👤 {client_name} (ID: {client_id})")
                 
                 print("-" * 30)
                 
         except Exception as e:
             self.logger.error(f"Error al obtener lista de clientes: {e}")
     
-    def register_events(self):
-        """Registrar eventos para escuchar comandos en el chat"""
-        try:
-            # Registrar eventos de chat del servidor
-            self.send_command("servernotifyregister event=textserver")
-            # Registrar eventos de chat de canal
-            self.send_command("servernotifyregister event=textchannel")
-            # Registrar eventos de chat privado
-            self.send_command("servernotifyregister event=textprivate")
-            
-            self.listening_events = True
-            self.logger.info("✅ Eventos registrados - escuchando comandos")
-            
-        except Exception as e:
-            self.logger.error(f"Error registrando eventos: {e}")
-    
     def get_client_name(self, client_id):
         """Obtener el nombre de un cliente por su ID"""
         try:
-            client_info = self.send_command(f"clientinfo clid={client_id}")
+            client_info = self.query.cached_command(f"clientinfo clid={client_id}")
             
-            if client_info and "error id=0" in client_info:
+            if is_ok(client_info):
                 # Parsear la respuesta para obtener el nickname
-                for part in client_info.split():
-                    if part.startswith("client_nickname="):
-                        return part.split("=", 1)[1]
+                client_name = parse_properties(client_info).get("client_nickname")
+                if client_name:
+                    return client_name
             
             return "Usuario"  # Nombre por defecto si no se puede obtener
             
@@ -254,40 +240,27 @@ class SimpleTeamSpeakBot:
             self.logger.error(f"Error obteniendo nombre del cliente {client_id}: {e}")
             return "Usuario"
     
-    def get_all_clients(self):
+    def get_all_clients(self, options=None):
         """Obtener lista de todos los clientes conectados (excluyendo solo el bot actual)"""
         try:
-            clients_info = self.send_command("clientlist")
+            # options: modificadores de clientlist, p. ej. "-times" para incluir client_idle_time
+            clients_info = self.query.cached_command(f"clientlist {options}" if options else "clientlist")
             clients = []
             
             self.logger.info(f"Debug - Respuesta clientlist: {clients_info}")
             
-            if clients_info and "error id=0" in clients_info:
-                # Parsear respuesta que puede venir en una sola línea con múltiples clientes
-                if "clid=" in clients_info:
-                    # Dividir por clid= para obtener cada cliente
-                    client_blocks = clients_info.split("clid=")[1:]  # Ignorar la parte antes del primer clid=
+            if is_ok(clients_info):
+                with tracer.span("parse_clientlist"):
+                    client_list = parse_list(clients_info)
+                
+                for client_data in client_list:
+                    self.logger.info(f"Debug - Cliente encontrado: {client_data}")
                     
-                    for block in client_blocks:
-                        client_data = {}
-                        # El primer valor es el ID del cliente
-                        parts = block.split()
-                        if parts:
-                            client_data['clid'] = parts[0]
-                            
-                            # Procesar el resto de los parámetros
-                            for part in parts:
-                                if '=' in part:
-                                    key, value = part.split('=', 1)
-                                    client_data[key] = value
-                        
-                        self.logger.info(f"Debug - Cliente encontrado: {client_data}")
-                        
-                        # Incluir todos los usuarios reales (client_type=0) excepto el bot actual
-                        if (client_data.get('client_type') == '0' and 
-                            client_data.get('clid') != self.bot_client_id):
-                            clients.append(client_data)
-                            self.logger.info(f"Debug - Cliente agregado: {client_data.get('client_nickname')} (ID: {client_data.get('clid')})")
+                    # Incluir todos los usuarios reales (client_type=0) excepto el bot actual
+                    if (client_data.get('client_type') == '0' and 
+                        client_data.get('clid') != self.bot_client_id):
+                        clients.append(client_data)
+                        self.logger.info(f"Debug - Cliente agregado: {client_data.get('client_nickname')} (ID: {client_data.get('clid')})")
             
             self.logger.info(f"Debug - Total clientes válidos encontrados: {len(clients)}")
             return clients
@@ -310,71 +283,83 @@ class SimpleTeamSpeakBot:
                 poke_message = f"[COLOR=#FF0000]{invoker_name}[/COLOR]\sle\sda\sun\stoque:\s{custom_message}"
             else:
                 # Mensaje por defecto si no se especifica uno
+                custom_message = "mensaje por defecto"
                 poke_message = f"[COLOR=#FF0000]{invoker_name}[/COLOR]\sle\sda\sun\stoque:\s¡Poke\smásivo\sde\s[COLOR=#0000FF]HarmonianBOT[/COLOR]!"
             
-            clients = self.get_all_clients()
-            poked_count = 0
-            
-            for client in clients:
-                client_id = client.get('clid')
-                client_name = client.get('client_nickname', 'Desconocido')
-                
-                if client_id:
-                    # Enviar poke al cliente con el mensaje personalizado
-                    poke_response = self.send_command(f"clientpoke clid={client_id} msg={poke_message}")
-                    
-                    if poke_response and "error id=0" in poke_response:
-                        poked_count += 1
-                        self.logger.info(f"👉 Poke enviado a {client_name}: {custom_message if message_parts and len(message_parts) > 1 else 'mensaje por defecto'}")
-                    else:
-                        self.logger.warning(f"❌ No se pudo hacer poke a {client_name}")
-            
-            self.logger.info(f"✅ Comando !mp ejecutado por {invoker_name} - {poked_count} usuarios recibieron poke")
+            self.start_mass_poke(poke_message, custom_message, invoker_name, invoker_id=invoker_id)
             
         except Exception as e:
             self.logger.error(f"Error ejecutando comando !mp: {e}")
     
+    def start_mass_poke(self, poke_message, description, initiator, clients=None, invoker_id=None):
+        """Encolar un poke para cada cliente y devolver el lote con su progreso"""
+        def on_result(client, success):
+            client_name = client.get('client_nickname', 'Desconocido')
+            if success:
+                self.logger.info(f"👉 Poke enviado a {client_name}: {description}")
+            else:
+                self.logger.warning(f"❌ No se pudo hacer poke a {client_name}")
+        
+        def on_complete(batch):
+            self.logger.info(f"✅ Comando !mp ejecutado por {initiator} - {batch.ok} usuarios recibieron poke")
+            self.audit_batch(batch, invoker_id, initiator, description)
+        
+        batch = CommandBatch("!mp", on_complete)
+        for client in (self.get_all_clients() if clients is None else clients):
+            client_id = client.get('clid')
+            if client_id:
+                # Enviar poke al cliente con el mensaje personalizado
+                batch.add(self.outbound, f"clientpoke clid={client_id} msg={poke_message}", client, on_result=on_result)
+        batch.seal()
+        return batch
+    
     def command_mass_move(self, invoker_id, channel_id):
         """Comando !mm - Mover todos los usuarios al canal donde se ejecutó el comando"""
         try:
-            # Obtener el canal del usuario que ejecutó el comando
+            # Obtener el canal del usuario que ejecutó el comando (sin caché: el canal actual)
             invoker_info = self.send_command(f"clientinfo clid={invoker_id}")
             target_channel_id = None
             
-            if invoker_info and "error id=0" in invoker_info:
-                for part in invoker_info.split():
-                    if part.startswith("cid="):
-                        target_channel_id = part.split("=")[1]
-                        break
+            if is_ok(invoker_info):
+                target_channel_id = parse_properties(invoker_info).get("cid")
             
             if not target_channel_id:
                 self.logger.error("❌ No se pudo obtener el canal del usuario que ejecutó el comando")
                 return
             
             invoker_name = self.get_client_name(invoker_id)
-            clients = self.get_all_clients()
-            moved_count = 0
-            
-            for client in clients:
-                client_id = client.get('clid')
-                client_name = client.get('client_nickname', 'Desconocido')
-                current_channel = client.get('cid')
-                
-                # Solo mover si no está ya en el canal de destino y no es el usuario que ejecutó el comando
-                if client_id and current_channel != target_channel_id and client_id != invoker_id:
-                    move_response = self.send_command(f"clientmove clid={client_id} cid={target_channel_id}")
-                    
-                    if move_response and "error id=0" in move_response:
-                        moved_count += 1
-                        self.logger.info(f"🚶 {client_name} movido al canal {target_channel_id}")
-                    else:
-                        self.logger.warning(f"❌ No se pudo mover a {client_name}")
-            
-            self.logger.info(f"✅ Comando !mm ejecutado por {invoker_name} - {moved_count} usuarios movidos al canal {target_channel_id}")
+            # No mover al usuario que ejecutó el comando
+            self.start_mass_move(target_channel_id, invoker_name, exclude_id=invoker_id, invoker_id=invoker_id)
             
         except Exception as e:
             self.logger.error(f"Error ejecutando comando !mm: {e}")
     
+    def start_mass_move(self, target_channel_id, initiator, clients=None, exclude_id=None, invoker_id=None):
+        """Encolar el movimiento de cada cliente al canal de destino y devolver el lote"""
+        def on_result(client, success):
+            client_name = client.get('client_nickname', 'Desconocido')
+            if success:
+                self.logger.info(f"🚶 {client_name} movido al canal {target_channel_id}")
+            else:
+                self.logger.warning(f"❌ No se pudo mover a {client_name}")
+        
+        def on_complete(batch):
+            # La lista de clientes cambió: no reutilizar la respuesta en caché
+            self.query.invalidate_cache("clientlist")
+            self.logger.info(f"✅ Comando !mm ejecutado por {initiator} - {batch.ok} usuarios movidos al canal {target_channel_id}")
+            self.audit_batch(batch, invoker_id, initiator, f"cid={target_channel_id}")
+        
+        batch = CommandBatch("!mm", on_complete)
+        for client in (self.get_all_clients() if clients is None else clients):
+            client_id = client.get('clid')
+            current_channel = client.get('cid')
+            
+            # Solo mover si no está ya en el canal de destino
+            if client_id and current_channel != target_channel_id and client_id != exclude_id:
+                batch.add(self.outbound, f"clientmove clid={client_id} cid={target_channel_id}", client, on_result=on_result)
+        batch.seal()
+        return batch
+    
     def command_mass_kick(self, invoker_id, channel_id, message_parts=None):
         """Comando !mk - Kick a todos los usuarios del servidor con mensaje personalizado"""
         try:
@@ -389,30 +374,58 @@ class SimpleTeamSpeakBot:
                 kick_reason = f"[COLOR=#FF0000]{invoker_name}[/COLOR]\sexpulsó\sa\stodos:\s{custom_message}"
             else:
                 # Mensaje por defecto si no se especifica uno
+                custom_message = "mensaje por defecto"
                 kick_reason = f"[COLOR=#FF0000]{invoker_name}[/COLOR]\sexpulsó\sa\stodos\spor\s[COLOR=#0000FF]HarmonianBOT[/COLOR]"
             
-            clients = self.get_all_clients()
-            kicked_count = 0
-            
-            for client in clients:
-                client_id = client.get('clid')
-                client_name = client.get('client_nickname', 'Desconocido')
-                
-                if client_id:
-                    # Kick del servidor (reasonid=5 = kick del servidor) con mensaje personalizado
-                    kick_response = self.send_command(f"clientkick clid={client_id} reasonid=5 reasonmsg={kick_reason}")
-                    
-                    if kick_response and "error id=0" in kick_response:
-                        kicked_count += 1
-                        self.logger.info(f"👢 {client_name} expulsado del servidor: {custom_message if message_parts and len(message_parts) > 1 else 'mensaje por defecto'}")
-                    else:
-                        self.logger.warning(f"❌ No se pudo expulsar a {client_name}")
-            
-            self.logger.info(f"✅ Comando !mk ejecutado por {invoker_name} - {kicked_count} usuarios expulsados")
+            self.start_mass_kick(kick_reason, custom_message, invoker_name, invoker_id=invoker_id)
             
         except Exception as e:
             self.logger.error(f"Error ejecutando comando !mk: {e}")
     
+    def start_mass_kick(self, kick_reason, description, initiator, clients=None, invoker_id=None):
+        """Encolar la expulsión de cada cliente del servidor y devolver el lote"""
+        def on_result(client, success):
+            client_name = client.get('client_nickname', 'Desconocido')
+            if success:
+                self.logger.info(f"👢 {client_name} expulsado del servidor: {description}")
+            else:
+                self.logger.warning(f"❌ No se pudo expulsar a {client_name}")
+        
+        def on_complete(batch):
+            # La lista de clientes cambió: no reutilizar la respuesta en caché
+            self.query.invalidate_cache("clientlist")
+            self.logger.info(f"✅ Comando !mk ejecutado por {initiator} - {batch.ok} usuarios expulsados")
+            self.audit_batch(batch, invoker_id, initiator, description)
+        
+        batch = CommandBatch("!mk", on_complete)
+        for client in (self.get_all_clients() if clients is None else clients):
+            client_id = client.get('clid')
+            if client_id:
+                # Kick del servidor (reasonid=5 = kick del servidor) con mensaje personalizado
+                batch.add(self.outbound, f"clientkick clid={client_id} reasonid=5 reasonmsg={kick_reason}", client, on_result=on_result)
+        batch.seal()
+        return batch
+    
+    def audit_batch(self, batch, invoker_id, invoker_name, arguments):
+        """Registrar en auditoría una acción masiva terminada con el resultado por objetivo"""
+        if not self.audit.enabled:
+            return
+        targets = [
+            {"clid": client.get('clid'), "name": client.get('client_nickname'), "ok": success}
+            for client, success in batch.results
+        ]
+        self.audit.record(
+            batch.name,
+            "ok" if not batch.failed else ("partial" if batch.ok else "failed"),
+            invoker_id=invoker_id,
+            invoker_name=invoker_name,
+            arguments=arguments,
+            targets=targets,
+            ok=batch.ok,
+            failed=batch.failed,
+            duration_ms=(batch.finished_at - batch.started_at) * 1000
+        )
+    
     def command_test_clients(self, invoker_id, channel_id):
         """Comando !test - Mostrar información de clientes para debugging"""
         try:
@@ -430,46 +443,83 @@ class SimpleTeamSpeakBot:
         """Verificar si el usuario tiene permisos para ejecutar el comando"""
         try:
             # Obtener información del cliente incluyendo sus grupos de servidor
+            # (sin caché: un grupo retirado deja de dar permiso al instante)
             client_info = self.send_command(f"clientinfo clid={invoker_id}")
             
-            if not client_info or "error id=0" not in client_info:
+            if not is_ok(client_info):
                 self.logger.error(f"No se pudo obtener información del cliente {invoker_id}")
                 return False
             
             # Extraer los grupos de servidor del usuario
-            user_server_groups = []
-            for part in client_info.split():
-                if part.startswith("client_servergroups="):
-                    groups_str = part.split("=", 1)[1]
-                    user_server_groups = groups_str.split(",")
-                    break
+            groups_str = parse_properties(client_info).get("client_servergroups", "")
+            user_server_groups = groups_str.split(",") if groups_str else []
             
             self.logger.info(f"Debug - Grupos del usuario {invoker_id}: {user_server_groups}")
             
-            # Definir permisos por comando
-            command_permissions = {
-                '!mp': '25770',  # Solo grupo 25770 puede usar !mp
-                '!mm': '25771',  # Solo grupo 25771 puede usar !mm
-                '!mk': '25787'   # Solo grupo 25787 puede usar !mk
-            }
-            
-            required_group = command_permissions.get(command)
-            if not required_group:
+            # Grupos que permiten el comando (config.COMMAND_PERMISSIONS, recargable)
+            if command not in self.permissions:
+                # Un comando sin entrada en la tabla nunca queda abierto por omisión
+                self.logger.warning(f"❌ Comando {command} sin entrada en COMMAND_PERMISSIONS - denegado")
+                return False
+            required_groups = self.permissions[command]
+            if not required_groups:
                 # Comando sin restricciones específicas (como !test)
                 return True
             
-            # Verificar si el usuario tiene el grupo requerido
-            if required_group in user_server_groups:
-                self.logger.info(f"✅ Usuario {invoker_id} tiene permisos para {command} (grupo {required_group})")
+            # Verificar si el usuario tiene alguno de los grupos requeridos
+            matching = [group for group in required_groups if group in user_server_groups]
+            if matching:
+                self.logger.info(f"✅ Usuario {invoker_id} tiene permisos para {command} (grupo {matching[0]})")
                 return True
             else:
-                self.logger.warning(f"❌ Usuario {invoker_id} NO tiene permisos para {command} (requiere grupo {required_group})")
+                self.logger.warning(f"❌ Usuario {invoker_id} NO tiene permisos para {command} (requiere grupo {', '.join(required_groups)})")
                 return False
                 
         except Exception as e:
             self.logger.error(f"Error verificando permisos del usuario {invoker_id}: {e}")
             return False
 
+    @staticmethod
+    def normalize_permissions(permissions):
+        """Convertir la tabla de permisos en comando -> tupla de grupos (vacía = sin restricciones)"""
+        table = {}
+        for command, groups in permissions.items():
+            if not groups:
+                groups = ()
+            elif not isinstance(groups, (list, tuple)):
+                groups = (groups,)
+            table[command] = tuple(str(group) for group in groups)
+        return table
+    
+    def apply_settings(self, values):
+        """Aplicar ajustes recargados (ya validados) sin reconectar; se llama desde el bucle principal"""
+        if "COMMAND_PERMISSIONS" in values:
+            # Sustitución de la tabla completa: nunca se ve una tabla a medio actualizar
+            self.permissions = self.normalize_permissions(values["COMMAND_PERMISSIONS"])
+        
+        if "OUTBOUND_WINDOW" in values:
+            self.outbound.window = max(1, values["OUTBOUND_WINDOW"])
+        if "OUTBOUND_DRAIN_BUDGET" in values:
+            self.outbound.budget = values["OUTBOUND_DRAIN_BUDGET"]
+        if "OUTBOUND_STARVATION_LIMIT" in values:
+            self.outbound.starvation_limit = values["OUTBOUND_STARVATION_LIMIT"]
+        
+        if "QUERY_CACHE_TTL" in values:
+            self.query.cache_ttl = values["QUERY_CACHE_TTL"]
+            self.query.invalidate_cache()
+        
+        if any(name.startswith("AFK_") for name in values):
+            # Los ajustes AFK no recargados conservan su valor efectivo actual
+            afk_settings = dict(effective_settings, **values)
+            self.afk.configure(
+                afk_settings["AFK_SWEEP_INTERVAL"],
+                afk_settings["AFK_CHANNEL_ID"],
+                afk_settings["AFK_MOVE_AFTER"],
+                afk_settings["AFK_AWAY_MOVE_AFTER"],
+                afk_settings["AFK_KICK_AFTER"],
+                afk_settings["AFK_KICK_MESSAGE"]
+            )
+    
     def process_command(self, message, invoker_id, channel_id):
         """Procesar comandos recibidos en el chat"""
         try:
@@ -486,14 +536,23 @@ class SimpleTeamSpeakBot:
             self.logger.info(f"Debug - Comandos disponibles: {list(self.commands.keys())}")
             
             if command in self.commands:
+                # Arranque: el primer comando cuenta como atendido cuando sale su primera respuesta
+                if self.first_reply_sequence is None:
+                    self.first_reply_sequence = self.outbound.sequence
+                    self.outbound.on_sent = self.on_outbound_sent
+                
                 # Verificar permisos antes de ejecutar el comando
-                if not self.check_user_permissions(invoker_id, command):
+                with tracer.span("permission_check"):
+                    allowed = self.check_user_permissions(invoker_id, command)
+                if not allowed:
                     user_name = self.get_client_name(invoker_id)
                     self.logger.warning(f"🚫 Comando {command} denegado para {user_name} (ID: {invoker_id}) - permisos insuficientes")
+                    self.audit.record(command, "denied", invoker_id=invoker_id, invoker_name=user_name,
+                                      arguments=" ".join(message_parts[1:]))
                     
                     # Enviar mensaje privado al usuario informando sobre la falta de permisos
                     error_message = f"❌\\sNo\\stienes\\spermisos\\spara\\susar\\sel\\scomando\\s{command}"
-                    self.send_command(f"sendtextmessage targetmode=1 target={invoker_id} msg={error_message}")
+                    self.outbound.submit(f"sendtextmessage targetmode=1 target={invoker_id} msg={error_message}", PRIORITY_INTERACTIVE)
                     return
                 
                 command_func = self.commands[command]
@@ -504,6 +563,10 @@ class SimpleTeamSpeakBot:
                     command_func(invoker_id, channel_id, message_parts)
                 else:
                     command_func(invoker_id, channel_id)
+                
+                # Comandos sin respuesta por la cola (como !test): atendidos al terminar
+                if self.outbound.sequence == self.first_reply_sequence:
+                    self.mark_startup("primer comando atendido")
             else:
                 self.logger.info(f"⚠️ Comando no reconocido: {command}")
             
@@ -516,27 +579,28 @@ class SimpleTeamSpeakBot:
             self.logger.info(f"Debug - Evento recibido: {event_data}")
             
             if "notifytextmessage" in event_data:
-                # Parsear evento de mensaje de texto
-                parts = event_data.split()
-                
-                invoker_id = None
-                message = None
-                channel_id = None
-                target_mode = None
-                invoker_name = None
-                
-                for part in parts:
-                    if part.startswith("invokerid="):
-                        invoker_id = part.split("=")[1]
-                    elif part.startswith("msg="):
-                        message = part.split("=", 1)[1].replace("\\s", " ")
-                    elif part.startswith("targetmode="):
-                        target_mode = part.split("=")[1]
-                        # targetmode=1 = privado, targetmode=2 = canal, targetmode=3 = servidor
-                    elif part.startswith("target="):
-                        channel_id = part.split("=")[1]
-                    elif part.startswith("invokername="):
-                        invoker_name = part.split("=", 1)[1]
+                with tracer.span("parse"):
+                    # Parsear evento de mensaje de texto
+                    parts = event_data.split()
+                    
+                    invoker_id = None
+                    message = None
+                    channel_id = None
+                    target_mode = None
+                    invoker_name = None
+                    
+                    for part in parts:
+                        if part.startswith("invokerid="):
+                            invoker_id = part.split("=")[1]
+                        elif part.startswith("msg="):
+                            message = part.split("=", 1)[1].replace("\\s", " ")
+                        elif part.startswith("targetmode="):
+                            target_mode = part.split("=")[1]
+                            # targetmode=1 = privado, targetmode=2 = canal, targetmode=3 = servidor
+                        elif part.startswith("target="):
+                            channel_id = part.split("=")[1]
+                        elif part.startswith("invokername="):
+                            invoker_name = part.split("=", 1)[1]
                 
                 self.logger.info(f"Debug - Mensaje procesado: {message} de {invoker_name} (ID: {invoker_id})")
                 
@@ -544,53 +608,51 @@ class SimpleTeamSpeakBot:
                 if (invoker_id and message and invoker_id != self.bot_client_id and 
                     message.startswith("!")):
                     self.logger.info(f"Debug - Procesando comando: {message}")
-                    self.process_command(message, invoker_id, channel_id)
+                    command_name = message.split()[0].lower()
+                    with tracer.span("command", command=command_name), tracer.profile(command_name):
+                        self.process_command(message, invoker_id, channel_id)
                     
         except Exception as e:
             self.logger.error(f"Error manejando evento: {e}")
     
     def disconnect(self):
         """Desconectar del servidor"""
-        if self.socket:
-            try:
-                self.send_command("logout")
-                self.socket.close()
-                self.logger.info("🔌 Desconectado del servidor")
-            except Exception as e:
-                self.logger.error(f"Error al desconectar: {e}")
-            finally:
-                self.connected = False
-                self.socket = None
-    
-    def is_connected(self):
-        """Verificar si la conexión está activa"""
-        if not self.connected or not self.socket:
-            return False
-        
-        try:
-            # Hacer una consulta simple para verificar la conexión
-            response = self.send_command("whoami")
-            return response and "error id=0" in response
-        except:
-            self.connected = False
-            return False
+        self.query.disconnect()
+    
+    def send_keepalive(self):
+        """Encolar un keepalive con prioridad de control (solo tras un periodo sin tráfico)"""
+        self.query.keepalive_sent()
+        self.outbound.submit(KEEPALIVE_COMMAND, PRIORITY_CONTROL, self.query.on_keepalive)
     
     def reconnect(self):
         """Intentar reconectar al servidor"""
-        if self.reconnect_attempts >= MAX_RECONNECT_ATTEMPTS:
-            self.logger.error(f"❌ Máximo de intentos de reconexión alcanzado ({MAX_RECONNECT_ATTEMPTS})")
+        if not self.query.reconnect(pipeline=self.fast_start):
             return False
         
-        self.reconnect_attempts += 1
-        self.logger.info(f"🔄 Intento de reconexión {self.reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}")
+        self.on_connected()
+        return True
+    
+    def process_pending(self, timeout):
+        """Atender eventos recibidos y enviar un tramo de la cola de salida; indica si hubo eventos"""
+        # Verificar si hay eventos pendientes (sin esperar si hay comandos o peticiones en cola)
+        events = self.query.poll_events(0 if self.outbound.pending() or self.control.pending() else timeout)
+        for event in events:
+            self.handle_event(event)
         
-        # Limpiar conexión anterior
-        self.disconnect()
+        # Peticiones de la API de control (solo encolan comandos o leen la caché)
+        self.control.drain()
         
-        # Esperar antes de reconectar
-        time.sleep(RECONNECT_DELAY)
+        # Ejecutar las tareas programadas que hayan vencido (solo encolan comandos)
+        self.scheduler.advance()
         
-        return self.connect()
+        # Enviar un tramo de la cola de salida; el resto sigue en la próxima vuelta,
+        # después de atender los eventos que hayan llegado mientras tanto
+        if self.outbound.pending():
+            with tracer.span("drain") as span:
+                if tracer.enabled:
+                    span.set(pending=self.outbound.pending())
+                self.outbound.drain()
+        return bool(events)
     
     def run(self):
         """Ejecutar el bot de forma continua"""
@@ -604,44 +666,52 @@ class SimpleTeamSpeakBot:
         self.logger.info("✅ Bot conectado y ejecutándose...")
         self.logger.info("Presiona Ctrl+C para detener el bot")
         
+        self.control.start(self)
+        
         try:
-            last_keepalive = time.time()
+            last_status = time.time()
             
             while True:
                 current_time = time.time()
                 
-                # Verificar si hay eventos pendientes
-                try:
-                    self.socket.settimeout(0.1)  # Timeout muy corto para no bloquear
-                    data = self.socket.recv(4096).decode('utf-8')
-                    if data and "notify" in data:
-                        self.handle_event(data.strip())
-                except socket.timeout:
-                    pass  # No hay eventos, continuar
-                except Exception:
-                    pass  # Error menor, continuar
+                received_event = self.process_pending(0.1)
                 
-                # Verificar conexión cada 60 segundos
-                if current_time - last_keepalive > 60:
-                    if not self.is_connected():
-                        self.logger.warning("⚠️  Conexión perdida, intentando reconectar...")
-                        if not self.reconnect():
-                            self.logger.error("❌ No se pudo reconectar. Deteniendo bot.")
-                            break
-                    
-                    last_keepalive = current_time
-                    
-                    # Mostrar estado cada 5 minutos
-                    if current_time % 300 < 60:
-                        self.logger.info("💚 Bot funcionando correctamente...")
+                # Información del servidor diferida: solo cuando no hay eventos que atender
+                if self.server_info_pending and not received_event and not self.outbound.pending():
+                    self.show_server_info()
+                
+                # Keepalive adaptativo: solo si no ha habido tráfico en el intervalo de detección
+                if self.query.keepalive_due():
+                    self.send_keepalive()
+                
+                # Reconectar en cuanto se detecte una caída (EOF, RST o keepalive sin respuesta)
+                if not self.connected:
+                    self.logger.warning("⚠️  Conexión perdida, intentando reconectar...")
+                    if not self.reconnect():
+                        self.logger.error("❌ No se pudo reconectar. Deteniendo bot.")
+                        self.outbound.discard()
+                        break
+                
+                # Mostrar estado cada 5 minutos
+                if current_time - last_status >= 300:
+                    last_status = current_time
+                    self.logger.info("💚 Bot funcionando correctamente...")
+                    self.logger.info(f"📈 ServerQuery ({self.query.backend_name}): {self.query.stats.summary()}")
+                    self.logger.info(f"📤 Cola de salida: {self.outbound.summary()}")
+                    if self.afk.enabled:
+                        self.logger.info(f"💤 AFK: {self.afk.summary()}")
                 
-                # Pausa corta para no consumir mucho CPU
-                time.sleep(0.5)
+                # Pausa corta para no consumir mucho CPU (solo si no queda nada por enviar);
+                # una petición de la API de control la interrumpe
+                if not self.outbound.pending():
+                    self.control.wait(0.5)
                 
         except KeyboardInterrupt:
             self.logger.info("\n🛑 Deteniendo bot por solicitud del usuario...")
         except Exception as e:
             self.logger.error(f"❌ Error inesperado: {e}")
         finally:
+            self.control.stop()
             self.disconnect()
+            self.audit.close()
             self.logger.info("👋 Bot detenido")
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Pruebas del índice de inactividad y sus transiciones (afk.py)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from afk import AFKEngine
+
+
+class FakeWheel:
+    tick = 1.0
+
+
+class FakeScheduler:
+    wheel = FakeWheel()
+
+
+class FakeBot:
+    """Registra las acciones masivas que lanza el motor"""
+
+    def __init__(self):
+        self.scheduler = FakeScheduler()
+        self.bot_client_id = "1"
+        self.connected = True
+        self.moves = []
+        self.kicks = []
+
+    def start_mass_move(self, channel_id, initiator, clients=None):
+        self.moves.append((channel_id, [client["clid"] for client in clients]))
+
+    def start_mass_kick(self, escaped_message, message, initiator, clients=None):
+        self.kicks.append([client["clid"] for client in clients])
+
+
+def client(clid, idle_seconds, cid="1", away=False):
+    return {
+        "clid": clid, "cid": cid, "client_type": "0",
+        "client_idle_time": str(int(idle_seconds * 1000)),
+        "client_away": "1" if away else "0", "client_output_muted": "0"
+    }
+
+
+class AFKEngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.bot = FakeBot()
+        self.afk = AFKEngine(self.bot, enabled=False, interval=30, channel_id=12, move_after=100,
+                             away_move_after=20, kick_after=300, kick_message="Inactivo")
+
+    def test_move_then_kick(self):
+        self.assertEqual(self.afk.sweep([client("5", 0)], now=1000), (0, 0))
+        self.assertEqual(self.afk.sweep([client("5", 99)], now=1099), (0, 0))
+        self.assertEqual(self.afk.sweep([client("5", 100)], now=1100), (1, 0))
+        self.assertEqual(self.bot.moves, [("12", ["5"])])
+
+        # Ya en el canal AFK y sin actividad: no se vuelve a mover, se expulsa al vencer
+        self.assertEqual(self.afk.sweep([client("5", 200, cid="12")], now=1200), (0, 0))
+        self.assertEqual(self.afk.sweep([client("5", 300, cid="12")], now=1300), (0, 1))
+        self.assertEqual(self.bot.kicks, [["5"]])
+
+        # Ninguna acción más para el mismo periodo de inactividad
+        self.assertEqual(self.afk.sweep([client("5", 400, cid="12")], now=1400), (0, 0))
+        self.assertEqual((self.afk.moved, self.afk.kicked), (1, 1))
+
+    def test_activity_resets_timer(self):
+        self.afk.sweep([client("5", 0)], now=1000)
+        self.afk.sweep([client("5", 0)], now=1050)
+        self.assertEqual(self.afk.sweep([client("5", 50)], now=1100), (0, 0))
+        self.assertEqual(self.afk.sweep([client("5", 100)], now=1150), (1, 0))
+
+    def test_activity_after_move_starts_over(self):
+        self.afk.sweep([client("5", 0)], now=1000)
+        self.afk.sweep([client("5", 100)], now=1100)
+        self.assertEqual(len(self.bot.moves), 1)
+
+        # Vuelve a hablar (fuera del canal AFK): otra vez se mueve tras move_after, sin expulsión
+        self.afk.sweep([client("5", 0)], now=1150)
+        self.assertEqual(self.afk.sweep([client("5", 50)], now=1200), (0, 0))
+        self.assertEqual(self.afk.sweep([client("5", 100)], now=1250), (1, 0))
+        self.assertEqual(self.bot.kicks, [])
+
+    def test_away_client_moves_sooner(self):
+        self.afk.sweep([client("5", 0, away=True)], now=1000)
+        self.assertEqual(self.afk.sweep([client("5", 20, away=True)], now=1020), (1, 0))
+
+    def test_disconnected_clients_leave_the_index(self):
+        self.afk.sweep([client("5", 0), client("6", 0)], now=1000)
+        self.assertEqual(set(self.afk.index), {"5", "6"})
+
+        self.afk.sweep([client("6", 50)], now=1050)
+        self.assertEqual(set(self.afk.index), {"6"})
+
+        # La entrada antigua del montículo se descarta al vencer
+        self.assertEqual(self.afk.sweep([client("6", 100)], now=1100), (1, 0))
+        self.assertEqual(self.bot.moves, [("12", ["6"])])
+
+    def test_ignores_bot_and_query_clients(self):
+        query_client = dict(client("7", 1000), client_type="1")
+        self.assertEqual(self.afk.sweep([client("1", 1000), query_client], now=2000), (0, 0))
+        self.assertEqual(self.afk.index, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Pruebas de la cola de salida con prioridades (command_queue.py)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_queue import OutboundScheduler, PRIORITY_CONTROL, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+OK = "error id=0 msg=ok"
+
+
+class FakeQuery:
+    """Registra cada escritura: una lista de comandos por envío"""
+
+    def __init__(self):
+        self.connected = True
+        self.writes = []
+
+    def send_command(self, command):
+        self.writes.append([command])
+        return OK
+
+    def send_commands(self, commands):
+        self.writes.append(list(commands))
+        return [OK] * len(commands)
+
+
+class OutboundSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.query = FakeQuery()
+
+    def sent(self):
+        return [command for write in self.query.writes for command in write]
+
+    def test_starvation_promotes_lower_class(self):
+        outbound = OutboundScheduler(self.query, window=1, budget=20, starvation_limit=2)
+        for i in range(5):
+            outbound.submit(f"i{i}", PRIORITY_INTERACTIVE)
+        outbound.submit("b0", PRIORITY_BULK)
+
+        self.assertEqual(outbound.drain(budget=3), 3)
+        self.assertEqual(self.sent(), ["i0", "i1", "b0"])
+        self.assertEqual(outbound.metrics[PRIORITY_BULK].promoted, 1)
+
+        outbound.drain()
+        self.assertEqual(self.sent()[3:], ["i2", "i3", "i4"])
+        self.assertEqual(outbound.pending(), 0)
+
+    def test_no_promotion_without_lower_class_waiting(self):
+        outbound = OutboundScheduler(self.query, window=1, budget=20, starvation_limit=1)
+        for i in range(4):
+            outbound.submit(f"i{i}", PRIORITY_INTERACTIVE)
+        outbound.drain()
+        self.assertEqual(self.sent(), ["i0", "i1", "i2", "i3"])
+        self.assertEqual(outbound.metrics[PRIORITY_BULK].promoted, 0)
+
+    def test_window_batches_commands(self):
+        outbound = OutboundScheduler(self.query, window=4, budget=20, starvation_limit=8)
+        for i in range(6):
+            outbound.submit(f"b{i}", PRIORITY_BULK)
+        self.assertEqual(outbound.drain(), 6)
+        self.assertEqual(self.query.writes, [["b0", "b1", "b2", "b3"], ["b4", "b5"]])
+
+    def test_budget_limits_window(self):
+        outbound = OutboundScheduler(self.query, window=4, budget=6, starvation_limit=8)
+        for i in range(10):
+            outbound.submit(f"b{i}", PRIORITY_BULK)
+        self.assertEqual(outbound.drain(), 6)
+        self.assertEqual([len(write) for write in self.query.writes], [4, 2])
+        self.assertEqual(outbound.pending(), 4)
+
+    def test_control_command_breaks_window(self):
+        outbound = OutboundScheduler(self.query, window=4, budget=20, starvation_limit=8)
+        for i in range(3):
+            outbound.submit(f"b{i}", PRIORITY_BULK)
+        outbound.submit("version", PRIORITY_CONTROL)
+        outbound.drain()
+        # El comando de control sale solo y primero; el resto completa su propia ventana
+        self.assertEqual(self.query.writes, [["version"], ["b0", "b1", "b2"]])
+
+    def test_callbacks_and_on_sent_in_order(self):
+        outbound = OutboundScheduler(self.query, window=4, budget=20, starvation_limit=8)
+        responses = []
+        sent = []
+        outbound.on_sent = lambda entry: sent.append(entry.sequence)
+        for i in range(3):
+            outbound.submit(f"b{i}", PRIORITY_BULK, lambda response, i=i: responses.append((i, response)))
+        outbound.drain()
+        self.assertEqual(responses, [(0, OK), (1, OK), (2, OK)])
+        self.assertEqual(sent, [0, 1, 2])
+
+    def test_drain_stops_when_disconnected(self):
+        outbound = OutboundScheduler(self.query, window=4, budget=20, starvation_limit=8)
+        outbound.submit("b0", PRIORITY_BULK)
+        self.query.connected = False
+        self.assertEqual(outbound.drain(), 0)
+        self.assertEqual(outbound.pending(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Pruebas de la rueda de temporizadores jerárquica (scheduler.py)
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler
+from scheduler import TimerWheel, WHEEL_SLOTS
+
+
+class TimerWheelTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fired = []
+
+    def schedule(self, wheel, delay, name):
+        return wheel.schedule(delay, lambda: self.fired.append((name, wheel.current_tick)))
+
+    def run_until(self, wheel, tick):
+        """Avanzar tick a tick, como el bucle principal con su espera corta"""
+        while wheel.current_tick < tick:
+            wheel.advance(wheel.current_tick + 1)
+
+    def test_fires_on_its_tick(self):
+        wheel = TimerWheel(tick=1.0, now=0)
+        self.schedule(wheel, 5, "a")
+        self.assertEqual(wheel.advance(4), 0)
+        self.assertEqual(wheel.advance(5), 1)
+        self.assertEqual(self.fired, [("a", 5)])
+        self.assertEqual(wheel.count, 0)
+
+    def test_delay_rounds_to_tick_and_at_least_one(self):
+        wheel = TimerWheel(tick=0.5, now=0)
+        self.schedule(wheel, 0, "now")
+        self.schedule(wheel, 1.2, "later")
+        self.run_until(wheel, 3)
+        self.assertEqual(self.fired, [("now", 1), ("later", 2)])
+
+    def test_fires_across_level_cascades(self):
+        wheel = TimerWheel(tick=1.0, now=0)
+        delays = [WHEEL_SLOTS - 1, WHEEL_SLOTS, WHEEL_SLOTS + 3, WHEEL_SLOTS ** 2 + 7, 3 * WHEEL_SLOTS ** 2]
+        for delay in delays:
+            self.schedule(wheel, delay, delay)
+        self.run_until(wheel, 3 * WHEEL_SLOTS ** 2 + 1)
+        self.assertEqual(self.fired, [(delay, delay) for delay in delays])
+
+    def test_scheduling_after_wheel_has_turned(self):
+        wheel = TimerWheel(tick=1.0, now=0)
+        self.run_until(wheel, WHEEL_SLOTS + 10)
+        self.schedule(wheel, WHEEL_SLOTS * 2, "a")
+        self.run_until(wheel, WHEEL_SLOTS * 4)
+        self.assertEqual(self.fired, [("a", WHEEL_SLOTS * 3 + 10)])
+
+    def test_large_advance_fires_everything_due(self):
+        wheel = TimerWheel(tick=1.0, now=0)
+        for delay in (3, WHEEL_SLOTS + 1, WHEEL_SLOTS ** 2 + 1):
+            self.schedule(wheel, delay, delay)
+        self.assertEqual(wheel.advance(WHEEL_SLOTS ** 2 + 1), 3)
+
+    def test_fires_past_the_horizon(self):
+        # Rueda pequeña (4 niveles de 4 ranuras = 256 ticks) para recorrer el horizonte entero
+        with mock.patch.object(scheduler, "WHEEL_SLOTS", 4):
+            wheel = TimerWheel(tick=1.0, now=0)
+            horizon = 4 ** scheduler.WHEEL_LEVELS
+            delays = [horizon - 1, horizon, horizon + 5, 3 * horizon + 17]
+            for delay in delays:
+                self.schedule(wheel, delay, delay)
+            self.run_until(wheel, 3 * horizon + 20)
+        self.assertEqual(self.fired, [(delay, delay) for delay in delays])
+        self.assertEqual(wheel.count, 0)
+
+    def test_cancelled_timer_does_not_fire(self):
+        wheel = TimerWheel(tick=1.0, now=0)
+        near = self.schedule(wheel, 3, "near")
+        far = self.schedule(wheel, WHEEL_SLOTS * 2, "far")
+        self.schedule(wheel, 5, "kept")
+        near.cancel()
+        far.cancel()
+        self.run_until(wheel, WHEEL_SLOTS * 3)
+        self.assertEqual(self.fired, [("kept", 5)])
+        self.assertEqual(wheel.count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
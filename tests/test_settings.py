@@ -0,0 +1,134 @@
+"""
+Pruebas de la carga y recarga de configuración (settings.py)
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import settings
+
+DEFAULTS = {
+    "COMMAND_PERMISSIONS": {"!mp": "25770", "!mm": "25771", "!mk": ["25787"], "!test": None},
+    "OUTBOUND_WINDOW": 4,
+    "OUTBOUND_DRAIN_BUDGET": 20,
+    "QUERY_CACHE_TTL": 2.0,
+    "COMMAND_TIMEOUT": 2.0,
+    "TS3_QUERY_PORT": 10011,
+    "CONFIG_PATH": "bot.toml",
+}
+
+
+class FakeBot:
+    """Solo registra los ajustes que le llegan en caliente"""
+
+    def __init__(self):
+        self.applied = []
+
+    def apply_settings(self, values):
+        self.applied.append(values)
+
+
+class SettingsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "bot.toml")
+        self.saved = dict(settings.DEFAULTS), dict(settings.effective)
+        settings.DEFAULTS.clear()
+        settings.DEFAULTS.update(DEFAULTS)
+        settings.effective.clear()
+        settings.effective.update(DEFAULTS)
+        for name in DEFAULTS:
+            os.environ.pop(settings.env_name(name), None)
+
+    def tearDown(self):
+        settings.DEFAULTS.clear()
+        settings.DEFAULTS.update(self.saved[0])
+        settings.effective.clear()
+        settings.effective.update(self.saved[1])
+        self.dir.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as config_file:
+            config_file.write(text)
+
+    def test_partial_permissions_reload_keeps_other_commands_protected(self):
+        self.write('[command_permissions]\n"!mp" = ["1", "2"]\n')
+        bot = FakeBot()
+        watcher = settings.ConfigWatcher(bot, 0, self.path)
+
+        self.assertTrue(watcher.reload())
+        permissions = bot.applied[-1]["COMMAND_PERMISSIONS"]
+        self.assertEqual(permissions["!mp"], ["1", "2"])
+        self.assertEqual(permissions["!mm"], "25771")
+        self.assertEqual(permissions["!mk"], ["25787"])
+        self.assertEqual(settings.effective["COMMAND_PERMISSIONS"], permissions)
+
+    def test_partial_permissions_from_environment(self):
+        os.environ["TS3_COMMAND_PERMISSIONS"] = '{"!test": "7"}'
+        try:
+            overrides = settings.load_overrides(DEFAULTS, None)
+        finally:
+            del os.environ["TS3_COMMAND_PERMISSIONS"]
+        permissions = overrides["COMMAND_PERMISSIONS"]
+        self.assertEqual(permissions["!test"], "7")
+        self.assertEqual(permissions["!mk"], ["25787"])
+
+    def test_unknown_command_rejects_reload(self):
+        self.write('[command_permissions]\n"!MP" = ""\n')
+        bot = FakeBot()
+        watcher = settings.ConfigWatcher(bot, 0, self.path)
+
+        self.assertFalse(watcher.reload())
+        self.assertEqual(bot.applied, [])
+        self.assertEqual(settings.effective["COMMAND_PERMISSIONS"], DEFAULTS["COMMAND_PERMISSIONS"])
+
+    def test_invalid_group_is_rejected(self):
+        self.write('[command_permissions]\n"!mk" = [true]\n')
+        with self.assertRaises(ValueError):
+            settings.load_overrides(DEFAULTS, self.path)
+
+    def test_float_setting_accepts_fraction_and_integer(self):
+        self.write('query_cache_ttl = 1.5\ncommand_timeout = 3\n')
+        overrides = settings.load_overrides(DEFAULTS, self.path)
+        self.assertEqual(overrides["QUERY_CACHE_TTL"], 1.5)
+        self.assertEqual(overrides["COMMAND_TIMEOUT"], 3.0)
+        self.assertIsInstance(overrides["COMMAND_TIMEOUT"], float)
+
+    def test_out_of_range_values_are_rejected(self):
+        for text in ('[outbound]\ndrain_budget = 0\n', '[outbound]\nwindow = -1\n',
+                     'query_cache_ttl = -1\n', 'command_timeout = 0\n',
+                     '[ts3]\nquery_port = 70000\n'):
+            with self.subTest(text=text):
+                self.write(text)
+                with self.assertRaises(ValueError):
+                    settings.load_overrides(DEFAULTS, self.path)
+
+    def test_one_invalid_value_rejects_whole_reload(self):
+        self.write('[outbound]\nwindow = 8\ndrain_budget = 0\n')
+        bot = FakeBot()
+        watcher = settings.ConfigWatcher(bot, 0, self.path)
+
+        self.assertFalse(watcher.reload())
+        self.assertEqual(bot.applied, [])
+        self.assertEqual(settings.effective["OUTBOUND_WINDOW"], 4)
+
+    def test_config_path_is_not_overridable(self):
+        self.write('config_path = "otro.toml"\n')
+        with self.assertRaises(ValueError):
+            settings.load_overrides(DEFAULTS, self.path)
+
+        os.environ["TS3_CONFIG_PATH"] = "otro.toml"
+        try:
+            overrides = settings.load_overrides(DEFAULTS, None)
+        finally:
+            del os.environ["TS3_CONFIG_PATH"]
+        self.assertNotIn("CONFIG_PATH", overrides)
+
+
+if __name__ == "__main__":
+    unittest.main()
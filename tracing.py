@@ -0,0 +1,171 @@
+"""
+Trazas de rendimiento del camino crítico (formato Chrome trace-event)
+
+Desactivado por defecto. Se activa con `main.py --trace [ARCHIVO]` o con la
+variable de entorno TS3_TRACE. La traza se abre en chrome://tracing o en
+https://ui.perfetto.dev.
+
+Con el trazado desactivado, `tracer.span()` devuelve un objeto compartido que
+no hace nada: el coste es una comprobación de atributo por llamada. Los
+argumentos que cuestan calcularse se añaden con `span.set()` solo dentro de
+`if tracer.enabled:`.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from config import TRACE_PATH, TRACE_MAX_EVENTS, PROFILE_EVERY, PROFILE_DIR
+
+
+class _NullSpan:
+    """Span vacío usado cuando el trazado está desactivado"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Intervalo medido que se guarda como evento completo ('X')"""
+
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.events.append({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self.start // 1000,
+            "dur": (end - self.start) // 1000,
+            "pid": self.tracer.pid,
+            "tid": threading.get_ident(),
+            "args": self.args
+        })
+        return False
+
+    def set(self, **args):
+        """Añadir argumentos al span (se ven en el visor)"""
+        self.args.update(args)
+
+
+class _Profile:
+    """Captura cProfile de un comando"""
+
+    def __init__(self, path):
+        self.path = path
+        self.profiler = cProfile.Profile()
+
+    def __enter__(self):
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.profiler.disable()
+        self.profiler.dump_stats(self.path)
+        return False
+
+
+class Tracer:
+    """Recolector de spans con exportación a Chrome trace-event JSON"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = TRACE_PATH
+        self.pid = os.getpid()
+        self.events = deque(maxlen=TRACE_MAX_EVENTS)
+        self.profile_every = 0
+        self.profile_dir = PROFILE_DIR
+        self.profiled_commands = 0
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, enabled, path=TRACE_PATH, profile_every=PROFILE_EVERY, profile_dir=PROFILE_DIR):
+        """Activar o desactivar el trazado y la captura cProfile por muestreo"""
+        self.enabled = enabled
+        self.path = path
+        self.profile_every = profile_every if enabled else 0
+        self.profile_dir = profile_dir
+        if enabled:
+            self.logger.info(f"🔬 Trazado activado - se exportará a {path}")
+            if self.profile_every:
+                os.makedirs(profile_dir, exist_ok=True)
+                self.logger.info(f"🔬 cProfile en 1 de cada {self.profile_every} comandos ({profile_dir}/)")
+
+    def span(self, name, category="bot", **args):
+        """Medir un bloque: `with tracer.span("parse"): ...`"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def command_span(self, command, category="query", **args):
+        """Span con el nombre del comando (sin parámetros); el nombre solo se calcula con el trazado activo"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, command.split(" ", 1)[0], category, args)
+
+    def profile(self, command):
+        """Capturar cProfile de un comando si le toca por muestreo"""
+        if not self.profile_every:
+            return NULL_SPAN
+        self.profiled_commands += 1
+        if self.profiled_commands % self.profile_every:
+            return NULL_SPAN
+        name = command.lstrip("!") or "comando"
+        path = os.path.join(self.profile_dir, f"{name}-{int(time.time() * 1000)}.prof")
+        return _Profile(path)
+
+    def instrument_logging(self):
+        """Medir el tiempo de escritura de cada log (handlers del logger raíz)"""
+        if not self.enabled:
+            return
+        for handler in logging.getLogger().handlers:
+            if getattr(handler, "_traced", False):
+                continue
+            emit = handler.emit
+
+            def traced_emit(record, emit=emit):
+                with self.span("log", "logging"):
+                    emit(record)
+
+            handler.emit = traced_emit
+            handler._traced = True
+
+    def export(self, path=None):
+        """Escribir los eventos en formato Chrome trace-event"""
+        if not self.enabled:
+            return None
+        path = path or self.path
+        with open(path, "w", encoding="utf-8") as trace:
+            json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, trace)
+        self.logger.info(f"🔬 Traza exportada a {path} ({len(self.events)} eventos)")
+        return path
+
+
+# Instancia compartida por todos los módulos
+tracer = Tracer()